@@ -0,0 +1,100 @@
+# benchmarks/bench_extract.py
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Allow running as `python benchmarks/bench_extract.py` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from extractors import available_extractors, detect_encoding, get_extractor
+
+
+def normalize(text: str) -> str:
+    """Apply the same whitespace cleanup DossierBuilder does after extraction"""
+    return re.sub(r'\n\s*\n', '\n\n', text)
+
+
+def load_corpus(corpus_dir: Path) -> List[Path]:
+    files = sorted(p for p in corpus_dir.rglob('*') if p.suffix.lower() in ('.html', '.htm'))
+    if not files:
+        raise SystemExit(f"No .html files found in {corpus_dir}")
+    return files
+
+
+def bench_encoding(bodies: Dict[str, bytes], repeat: int) -> Dict[str, float]:
+    """Compare detect_encoding with the charset guessing behind requests' apparent_encoding"""
+    results = {}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for body in bodies.values():
+            detect_encoding(body)
+    results["detect_encoding_seconds"] = round(time.perf_counter() - start, 4)
+
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return results
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for body in bodies.values():
+            from_bytes(body).best()
+    results["charset_normalizer_seconds"] = round(time.perf_counter() - start, 4)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark HTML text extraction backends against the BeautifulSoup reference"
+    )
+    parser.add_argument("corpus", help="Directory of saved .html pages")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="Times each backend processes the corpus (default: 3)")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    files = load_corpus(Path(args.corpus))
+    bodies = {str(path): path.read_bytes() for path in files}
+    documents = {name: body.decode(detect_encoding(body), errors='replace') for name, body in bodies.items()}
+    total_bytes = sum(len(body) for body in bodies.values())
+
+    report = {
+        "corpus": str(args.corpus),
+        "documents": len(documents),
+        "bytes": total_bytes,
+        "encoding": bench_encoding(bodies, args.repeat),
+        "backends": {}
+    }
+
+    reference = get_extractor("bs4")
+    expected = {name: normalize(reference.extract(html)) for name, html in documents.items()}
+
+    for backend in available_extractors():
+        extractor = get_extractor(backend)
+        outputs = {}
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for name, html in documents.items():
+                outputs[name] = extractor.extract(html)
+        elapsed = time.perf_counter() - start
+
+        mismatches = [name for name, text in outputs.items() if normalize(text) != expected[name]]
+        report["backends"][backend] = {
+            "seconds": round(elapsed, 4),
+            "docs_per_second": round(len(documents) * args.repeat / elapsed, 2),
+            "mb_per_second": round(total_bytes * args.repeat / elapsed / 1e6, 2),
+            "matching_documents": len(documents) - len(mismatches),
+            "mismatched": mismatches
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding='utf-8')
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,631 @@
+# benchmarks/bench_pipeline.py
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Allow running as `python benchmarks/bench_pipeline.py` from the repository root
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from token_counter import TokenCounter
+
+TARGET = "Jane Example"
+TERMS = ["Northwind"]
+
+FIRST_NAMES = ["Alice", "Bruno", "Chen", "Dana", "Elif", "Farid", "Grace", "Hugo", "Ines", "Jonas",
+               "Kira", "Luca", "Maya", "Nils", "Olga", "Priya", "Quinn", "Rosa", "Sami", "Tomas"]
+LAST_NAMES = ["Abbott", "Brandt", "Costa", "Duarte", "Eriksen", "Fischer", "Garcia", "Hoffman", "Ivanov",
+              "Jensen", "Kowalski", "Larsen", "Moreau", "Novak", "Okafor", "Petrov", "Quint", "Rossi"]
+ORGANIZATIONS = ["Northwind Corporation", "Blue Harbor Group", "Cedar Analytics Inc", "Delta Freight Ltd",
+                 "Evergreen Holdings", "Falcon Media Group", "Granite Labs Inc", "Helios Energy Ltd"]
+CITIES = ["Lisbon", "Oslo", "Denver", "Osaka", "Nairobi", "Krakow", "Porto", "Austin"]
+WORDS = ("the project report meeting office annual board member program research public record "
+         "interview account profile address contract team conference article network former").split()
+
+_NAME = re.compile(r"\b[A-Z][a-z]+ [A-Z][a-z]+\b")
+_ORGANIZATION = re.compile(r"\b(?:[A-Z][a-z]+ )+(?:Corporation|Group|Inc|Ltd|Holdings|Labs)\b")
+_BATCH_PAGE = re.compile(r"^\s*=== PAGE (\d+) ===\s*$", re.MULTILINE)
+
+
+# --- Fixture corpus ---
+
+def make_sentence(rng: random.Random) -> str:
+    person = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    filler = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14)))
+    templates = [
+        f"{TARGET} met {person} of {rng.choice(ORGANIZATIONS)} in {rng.choice(CITIES)} to discuss the {filler}.",
+        f"According to {person}, the {filler} was filed in {rng.choice(CITIES)} in {rng.randint(1995, 2024)}.",
+        f"{rng.choice(ORGANIZATIONS)} listed {TARGET} as a {filler} contact.",
+        f"The {filler} mentions {person} and {rng.choice(ORGANIZATIONS)}.",
+    ]
+    return rng.choice(templates)
+
+
+def make_paragraphs(rng: random.Random, words: int) -> List[str]:
+    paragraphs = []
+    count = 0
+    while count < words:
+        paragraph = " ".join(make_sentence(rng) for _ in range(rng.randint(3, 6)))
+        count += len(paragraph.split())
+        paragraphs.append(paragraph)
+    return paragraphs
+
+
+def make_html(title: str, paragraphs: List[str]) -> bytes:
+    body = "\n".join(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{title}</title></head>"
+            f"<body><nav><a href=\"/\">Home</a></nav><article><h1>{title}</h1>\n{body}\n</article>"
+            f"<footer>Fixture page</footer></body></html>").encode('utf-8')
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """Minimal text-only PDF with one Helvetica line per string, readable by PyPDF2"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for lines in pages:
+        stream = ("BT /F1 9 Tf 11 TL 40 760 Td "
+                  + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET").encode('latin-1')
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode('latin-1') + stream + b"\nendstream")
+        content_number = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_number} 0 R >>".encode('latin-1')
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode('latin-1')
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode('latin-1') + body + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    output += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('latin-1')
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    return bytes(output)
+
+
+def make_pdf_document(rng: random.Random, page_count: int, words_per_page: int = 500) -> bytes:
+    pages = []
+    for _ in range(page_count):
+        words = " ".join(make_paragraphs(rng, words_per_page)).split()
+        pages.append([" ".join(words[i:i + 14]) for i in range(0, len(words), 14)][:64])
+    return make_pdf(pages)
+
+
+def build_corpus(rng: random.Random, pages: int, page_words: int, mirror_ratio: float,
+                 pdfs: int) -> Dict[str, Tuple[str, bytes]]:
+    """Fixture web pages keyed by path: HTML articles, mirrors of some of them, and a few PDFs"""
+    corpus: Dict[str, Tuple[str, bytes]] = {}
+    mirrors = int(pages * mirror_ratio)
+    originals = []
+    for number in range(max(1, pages - mirrors - pdfs)):
+        paragraphs = make_paragraphs(rng, page_words)
+        originals.append(paragraphs)
+        corpus[f"/page{number}.html"] = ("text/html; charset=utf-8", make_html(f"{TARGET} - page {number}", paragraphs))
+    for number in range(mirrors):
+        # Same article under a different URL and chrome, as on syndication sites
+        paragraphs = originals[number % len(originals)]
+        corpus[f"/mirror{number}.html"] = ("text/html; charset=utf-8", make_html(f"{TARGET} (mirror {number})", paragraphs))
+    for number in range(pdfs):
+        corpus[f"/report{number}.pdf"] = ("application/pdf", make_pdf_document(rng, 4))
+    return corpus
+
+
+class CorpusServer:
+    """Serves the fixture corpus over local HTTP, optionally with a per-request delay"""
+
+    def __init__(self, corpus: Dict[str, Tuple[str, bytes]], latency: float = 0.0):
+        corpus_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without this, delayed ACKs add ~40ms per request
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                entry = corpus.get(self.path.split("?")[0])
+                if corpus_server.latency:
+                    time.sleep(corpus_server.latency)
+                if entry is None:
+                    self.send_error(404)
+                    return
+                content_type, body = entry
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.latency = latency
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubSearchEngine:
+    """Stands in for duckduckgo_search.DDGS, returning the fixture corpus as search results.
+
+    Like DDGS.text, each call returns a complete list after one simulated round
+    trip per result page; `max_results=None` returns only the first page.
+    """
+
+    def __init__(self, results: List[Dict[str, str]], page_size: int = 10, page_latency: float = 0.0):
+        self.results = results
+        self.page_size = page_size
+        self.page_latency = page_latency
+
+    def text(self, query: str, max_results: Optional[int] = None) -> List[Dict[str, str]]:
+        results = self.results[:max_results or self.page_size]
+        time.sleep(self.page_latency * max(1, math.ceil(len(results) / self.page_size)))
+        return results
+
+
+def search_results(corpus: Dict[str, Tuple[str, bytes]], base_url: str) -> List[Dict[str, str]]:
+    return [
+        {"title": f"{TARGET} - {path.strip('/')}", "href": base_url + path, "body": f"Profile of {TARGET}"}
+        for path in corpus
+    ]
+
+
+# --- Mock LLM server ---
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50": None, "p90": None, "p99": None}
+    return {
+        f"p{int(fraction * 100)}": round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1)
+        for fraction in (0.5, 0.9, 0.99)
+    }
+
+
+class MockLLMServer:
+    """OpenAI-compatible chat completions stub with a llama.cpp-style /tokenize endpoint.
+
+    Each request waits for one of `slots` decoding slots, then takes
+    `latency` seconds plus its completion tokens at `token_rate` tokens per
+    second, like a local inference server. Replies are shaped like what the
+    caller asked for: entity JSON for a response_format, one section per page
+    for batched analysis, and bullet points otherwise.
+    """
+
+    def __init__(self, latency: float = 0.2, token_rate: float = 200.0, reply_tokens: int = 120, slots: int = 4):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.reply_tokens = reply_tokens
+        self.slots = threading.BoundedSemaphore(slots)
+        self.lock = threading.Lock()
+        self.reset_stats()
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+                if self.path.endswith("/tokenize"):
+                    self._send_json({"tokens": list(range(TokenCounter.estimate(body.get("content", ""))))})
+                elif self.path.endswith("/chat/completions"):
+                    mock.complete(self, body)
+                else:
+                    self.send_error(404)
+
+            def _send_json(self, data: Dict[str, Any]) -> None:
+                payload = json.dumps(data).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.requests: Dict[str, int] = {}
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.queue_seconds: List[float] = []
+            self.latency_seconds: List[float] = []
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": sum(self.requests.values()),
+                "requests_by_kind": dict(self.requests),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "queue_ms": _percentiles(self.queue_seconds),
+                "latency_ms": _percentiles(self.latency_seconds)
+            }
+
+    @staticmethod
+    def classify(body: Dict[str, Any]) -> str:
+        messages = body.get("messages") or [{}]
+        system = messages[0].get("content", "") if messages[0].get("role") == "system" else ""
+        if body.get("response_format") or "entit" in system.lower() or "names of people" in system:
+            return "entities"
+        if _BATCH_PAGE.search(messages[-1].get("content", "")):
+            return "batch_analysis"
+        if "condensing" in system:
+            return "summary"
+        if "dossier" in system:
+            return "dossier"
+        return "analysis"
+
+    def _bullets(self, rng: random.Random, tokens: int) -> str:
+        lines = []
+        while sum(TokenCounter.estimate(line) for line in lines) < tokens:
+            lines.append(f"- {make_sentence(rng)}")
+        return "\n".join(lines)
+
+    def reply(self, kind: str, body: Dict[str, Any]) -> str:
+        prompt = (body.get("messages") or [{}])[-1].get("content", "")
+        rng = random.Random(len(prompt))
+        if kind == "entities":
+            keys = ["people", "organizations"]
+            response_format = body.get("response_format") or {}
+            schema = response_format.get("json_schema", {}).get("schema", {})
+            keys = list(schema.get("properties", {})) or keys
+            organizations = sorted(set(_ORGANIZATION.findall(prompt)))
+            people = sorted(set(_NAME.findall(prompt)) - set(organizations))
+            return json.dumps({keys[0]: people[:25], keys[-1]: organizations[:25]})
+        if kind == "batch_analysis":
+            numbers = _BATCH_PAGE.findall(prompt)
+            return "\n".join(f"=== PAGE {number} ===\n{self._bullets(rng, self.reply_tokens)}" for number in numbers)
+        return self._bullets(rng, self.reply_tokens)
+
+    def complete(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        kind = self.classify(body)
+        content = self.reply(kind, body)
+        tokens = TokenCounter.estimate(content)
+        prompt_tokens = sum(TokenCounter.estimate(m.get("content", "")) for m in body.get("messages", []))
+
+        received = time.perf_counter()
+        with self.slots:
+            started = time.perf_counter()
+            if body.get("stream"):
+                self._stream(handler, content, tokens)
+            else:
+                time.sleep(self.latency + tokens / self.token_rate)
+                payload = json.dumps({
+                    "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": tokens}
+                }).encode('utf-8')
+                handler.send_response(200)
+                handler.send_header("Content-Type", "application/json")
+                handler.send_header("Content-Length", str(len(payload)))
+                handler.end_headers()
+                handler.wfile.write(payload)
+        finished = time.perf_counter()
+
+        with self.lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += tokens
+            self.queue_seconds.append(started - received)
+            self.latency_seconds.append(finished - received)
+
+    def _stream(self, handler: BaseHTTPRequestHandler, content: str, tokens: int) -> None:
+        """Send the reply as server-sent events, one chunk per word as it is generated"""
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        handler.wfile.flush()
+
+        def send_chunk(data: bytes) -> None:
+            handler.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            handler.wfile.flush()
+
+        time.sleep(self.latency)
+        pieces = re.findall(r"\S+\s*", content)
+        for piece in pieces:
+            delta = json.dumps({"choices": [{"delta": {"content": piece}}]})
+            send_chunk(f"data: {delta}\n\n".encode('utf-8'))
+            time.sleep(tokens / self.token_rate / max(1, len(pieces)))
+        send_chunk(b"data: [DONE]\n\n")
+        handler.wfile.write(b"0\r\n\r\n")
+        handler.wfile.flush()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# --- Scenarios (each runs in its own process so peak RSS is per scenario) ---
+
+def timed(items: Iterable[Any], stats: Dict[str, float]) -> Iterator[Any]:
+    """Pass items through, adding the time spent waiting on the source to `stats`"""
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats["seconds"] = round(stats.get("seconds", 0.0) + time.perf_counter() - start, 3)
+            return
+        stats["seconds"] = stats.get("seconds", 0.0) + time.perf_counter() - start
+        stats["items"] = stats.get("items", 0) + 1
+        yield item
+
+
+def stage_breakdown(pipeline_stats: Dict[str, Dict]) -> Dict[str, Dict]:
+    breakdown = {}
+    for name, stats in pipeline_stats.items():
+        processed = stats.get("processed", 0)
+        breakdown[name] = {
+            **stats,
+            "avg_ms": round(stats["busy_seconds"] / processed * 1000, 1) if processed and "busy_seconds" in stats else None
+        }
+    return breakdown
+
+
+def bench_web(config: Dict[str, Any], llm_url: str) -> Dict[str, Any]:
+    """main.py flow: streamed search, fetch/extract/dedupe/analyze pipeline, then the dossier"""
+    from search import DossierBuilder
+
+    builder = DossierBuilder(
+        llm_url=llm_url,
+        analyze_workers=config["analyze_workers"],
+        batch_pages=config["batch_pages"],
+        host_rate=config["host_rate"],
+        page_cache_dir=None,
+        llm_cache_path=None,
+        search_cache_path=None,
+        resume=False
+    )
+    builder.search_engine = StubSearchEngine(config["search_results"], page_latency=config["search_latency"])
+
+    start = time.perf_counter()
+    results = builder.iter_search(TARGET, TERMS, max_results=len(config["search_results"]))
+    distilled_path = builder.process_search_results(results, TARGET, TERMS)
+    analyzed = time.perf_counter()
+    dossier_path = builder.generate_final_dossier(distilled_path, TARGET, TERMS)
+    finished = time.perf_counter()
+
+    pages = builder.last_pipeline_stats.get("fetch", {}).get("processed", 0)
+    skipped = builder.last_pipeline_stats.get("dedupe", {}).get("near_duplicates", 0)
+    if config["mirrors"] and not skipped:
+        raise RuntimeError(f"None of the {config['mirrors']} mirror pages was skipped as a near-duplicate")
+    return {
+        "pages": pages,
+        "near_duplicates_skipped": skipped,
+        "dossier_written": bool(dossier_path and Path(dossier_path).exists()),
+        "seconds": round(finished - start, 3),
+        "pages_per_second": round(pages / (analyzed - start), 2) if analyzed > start else None,
+        "phases": {
+            "search_and_analyze_seconds": round(analyzed - start, 3),
+            "dossier_seconds": round(finished - analyzed, 3)
+        },
+        "stages": stage_breakdown(builder.last_pipeline_stats),
+        "llm_client": builder.last_llm_stats
+    }
+
+
+def bench_pdf(config: Dict[str, Any], llm_url: str) -> Dict[str, Any]:
+    """analyze_pdf.py flow: parallel page extraction streamed into concurrent entity extraction"""
+    from report2dossier.pdf_analyzer import DocumentAnalyzer
+
+    analyzer = DocumentAnalyzer(llm_url, llm_cache_path=None, chunk_workers=config["chunk_workers"], ocr=False)
+    page_stats: Dict[str, float] = {}
+    start = time.perf_counter()
+    people, organizations = analyzer.extract_entities(timed(analyzer.iter_pdf_pages(config["pdf_path"]), page_stats))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "pages": page_stats.get("items", 0),
+        "people": len(people),
+        "organizations": len(organizations),
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(page_stats.get("items", 0) / elapsed, 2),
+        # Time the chunker spent blocked on page text; the rest overlapped with LLM calls
+        "stages": {"pdf_text_wait": page_stats},
+        "llm_client": analyzer.llm_client.limiter.stats()
+    }
+
+
+def bench_txt(config: Dict[str, Any], llm_url: str) -> Dict[str, Any]:
+    """txt2list.py flow: a streamed text file through the chunker and concurrent entity extraction"""
+    from report2dossier.txt2list import EntityExtractor
+
+    extractor = EntityExtractor(url=llm_url, llm_cache_path=None, workers=config["chunk_workers"])
+    chunk_stats: Dict[str, float] = {}
+    read_chunks = extractor.iter_file_chunks
+    extractor.iter_file_chunks = lambda input_file: timed(read_chunks(input_file), chunk_stats)
+
+    start = time.perf_counter()
+    entities = extractor.process_file(Path(config["text_path"]))
+    elapsed = time.perf_counter() - start
+
+    size = Path(config["text_path"]).stat().st_size
+    return {
+        "bytes": size,
+        "chunks": chunk_stats.get("items", 0),
+        "persons": len(entities["persons"]),
+        "organizations": len(entities["organizations"]),
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(size / elapsed / 1e6, 3),
+        "stages": {"read_and_chunk_wait": chunk_stats},
+        "llm_client": extractor.llm_client.limiter.stats()
+    }
+
+
+SCENARIOS = {"web": bench_web, "pdf": bench_pdf, "txt": bench_txt}
+
+
+def _run_scenario(name: str, config: Dict[str, Any], llm_url: str, workdir: str, connection) -> None:
+    try:
+        os.chdir(workdir)
+        if not config["verbose"]:
+            logging.disable(logging.INFO)
+            # Keep progress bars and status prints out of the report
+            sys.stdout = sys.stderr = open(os.devnull, "w")
+        result = SCENARIOS[name](config, llm_url)
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+        result["children_peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+        connection.send(result)
+    except Exception as e:
+        connection.send({"error": f"{type(e).__name__}: {str(e)}"})
+    finally:
+        connection.close()
+
+
+def run_scenario(name: str, config: Dict[str, Any], llm: MockLLMServer, workdir: str) -> Dict[str, Any]:
+    llm.reset_stats()
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_run_scenario, args=(name, config, llm.url, workdir, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"error": "scenario process died"}
+    process.join()
+    result["llm_server"] = llm.stats()
+    if name != "web" and "seconds" in result:
+        chunks = result["llm_server"]["requests_by_kind"].get("entities", 0)
+        result["chunks_per_second"] = round(chunks / result["seconds"], 2) if result["seconds"] else None
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline throughput benchmark of the web, PDF and text pipelines against a mock LLM "
+                    "server and a local fixture corpus"
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="Scenarios to run (default: all)")
+    parser.add_argument("--pages", type=int, default=40, help="Search results in the web corpus (default: 40)")
+    parser.add_argument("--page-words", type=int, default=800, help="Words per fixture web page (default: 800)")
+    parser.add_argument("--mirror-ratio", type=float, default=0.1,
+                        help="Share of web results that mirror another page (default: 0.1)")
+    parser.add_argument("--page-latency", type=float, default=0.02,
+                        help="Seconds the corpus server waits before each response (default: 0.02)")
+    parser.add_argument("--search-latency", type=float, default=0.3,
+                        help="Seconds the stub search engine takes per page of 10 results (default: 0.3)")
+    parser.add_argument("--pdf-pages", type=int, default=60, help="Pages in the PDF scenario (default: 60)")
+    parser.add_argument("--text-mb", type=float, default=0.5, help="Size of the text scenario file (default: 0.5)")
+    parser.add_argument("--llm-latency", type=float, default=0.2,
+                        help="Mock LLM time to first token in seconds (default: 0.2)")
+    parser.add_argument("--token-rate", type=float, default=200.0,
+                        help="Mock LLM completion tokens per second per request (default: 200)")
+    parser.add_argument("--reply-tokens", type=int, default=120,
+                        help="Approximate completion length of analysis replies (default: 120)")
+    parser.add_argument("--slots", type=int, default=4,
+                        help="Requests the mock LLM serves at once; the rest queue (default: 4)")
+    parser.add_argument("--analyze-workers", type=int, default=4, help="Web analysis workers (default: 4)")
+    parser.add_argument("--batch-pages", type=int, default=1, help="Web pages per analysis request (default: 1)")
+    parser.add_argument("--chunk-workers", type=int, default=4,
+                        help="Concurrent entity extraction chunks for PDF and text (default: 4)")
+    parser.add_argument("--host-rate", type=float, default=1000.0,
+                        help="Per-host request rate; the corpus is one local host (default: 1000)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated corpus (default: 0)")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show pipeline logs and progress output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    llm = MockLLMServer(args.llm_latency, args.token_rate, args.reply_tokens, args.slots)
+    corpus = build_corpus(rng, args.pages, args.page_words, args.mirror_ratio, pdfs=min(2, args.pages // 10))
+    corpus_server = CorpusServer(corpus, args.page_latency)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "verbose")},
+        "scenarios": {}
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as workdir:
+        config = {
+            "verbose": args.verbose,
+            "analyze_workers": args.analyze_workers,
+            "batch_pages": args.batch_pages,
+            "chunk_workers": args.chunk_workers,
+            "host_rate": args.host_rate,
+            "search_results": search_results(corpus, corpus_server.url),
+            "search_latency": args.search_latency,
+            "mirrors": sum(1 for path in corpus if path.startswith("/mirror")),
+            "pdf_path": str(Path(workdir) / "report.pdf"),
+            "text_path": str(Path(workdir) / "corpus.txt")
+        }
+        if "pdf" in args.scenarios:
+            Path(config["pdf_path"]).write_bytes(make_pdf_document(rng, args.pdf_pages))
+        if "txt" in args.scenarios:
+            with open(config["text_path"], "w", encoding="utf-8") as f:
+                written = 0
+                while written < args.text_mb * 1e6:
+                    paragraph = " ".join(make_paragraphs(rng, 200)) + "\n\n"
+                    f.write(paragraph)
+                    written += len(paragraph.encode('utf-8'))
+
+        for name in args.scenarios:
+            print(f"Running {name} scenario...", file=sys.stderr)
+            report["scenarios"][name] = run_scenario(name, config, llm, workdir)
+
+    corpus_server.close()
+    llm.close()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding='utf-8')
+    print(output)
+    if any("error" in result for result in report["scenarios"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
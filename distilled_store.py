@@ -0,0 +1,150 @@
+# distilled_store.py
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+class DistilledStore:
+    """Append-only JSONL store for distilled page analyses.
+
+    The first line is a metadata record and every following line is one
+    result, so saving progress costs one appended line instead of rewriting
+    the whole file. Writes are flushed immediately and fsynced in batches;
+    `compact` produces the classic `{"metadata": ..., "results": [...]}` JSON.
+    """
+
+    def __init__(self, path: Path, fsync_every: int = 8):
+        self.path = Path(path)
+        self.fsync_every = fsync_every
+        self.handle = None
+        self.unsynced = 0
+
+    def open(self, metadata: Dict) -> None:
+        """Start a new store, replacing any existing file"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.handle = self.path.open('w', encoding='utf-8')
+        self._write({"type": "metadata", **metadata})
+        self.sync()
+
+    def resume(self, metadata: Dict, legacy_path: Optional[Path] = None) -> List[Dict]:
+        """Reopen an existing store for appending and return the results it already holds.
+
+        Falls back to a legacy distilled JSON file when no JSONL store exists.
+        The store is rewritten once so a torn final line from a crash is dropped.
+        """
+        source = self.path if self.path.exists() else legacy_path
+        existing: List[Dict] = []
+        if source and Path(source).exists():
+            existing = load_distilled(source)["results"]
+
+        self.open(metadata)
+        for result in existing:
+            self._write({"type": "result", **result})
+        self.sync()
+        return existing
+
+    def append(self, result: Dict) -> None:
+        """Append one result record"""
+        self.append_record({"type": "result", **result})
+
+    def append_duplicate(self, url: str, duplicate_of: str, similarity: float) -> None:
+        """Record a page that was skipped as a near-duplicate of an analyzed one"""
+        self.append_record({"type": "duplicate", "url": url, "duplicate_of": duplicate_of, "similarity": similarity})
+
+    def append_record(self, record: Dict) -> None:
+        self._write(record)
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every:
+            self.sync()
+
+    def _write(self, record: Dict) -> None:
+        self.handle.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.handle.flush()
+
+    def sync(self) -> None:
+        """Force buffered records to disk"""
+        if self.handle:
+            self.handle.flush()
+            os.fsync(self.handle.fileno())
+        self.unsynced = 0
+
+    def close(self) -> None:
+        if self.handle:
+            self.sync()
+            self.handle.close()
+            self.handle = None
+
+    def compact(self, json_path: Path) -> Path:
+        """Write the store out as a single distilled JSON document"""
+        data = load_distilled(self.path)
+        json_path = Path(json_path)
+        tmp_path = json_path.with_suffix(json_path.suffix + '.tmp')
+        with tmp_path.open('w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, json_path)
+        return json_path
+
+
+def iter_distilled(path: Path) -> Iterator[Dict]:
+    """Lazily yield records from a distilled file.
+
+    JSONL stores yield their records line by line; legacy JSON files yield a
+    metadata record followed by one record per result.
+    """
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        with path.open('r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a torn final line; everything before it is intact
+                    break
+        return
+
+    with path.open('r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or "metadata" not in data or not isinstance(data.get("results"), list):
+        raise ValueError("Distilled file must contain 'metadata' and a 'results' list")
+    yield {"type": "metadata", **data["metadata"]}
+    for result in data["results"]:
+        yield {"type": "result", **result} if isinstance(result, dict) else result
+
+
+def load_distilled(path: Path) -> Dict:
+    """Load a distilled file (JSON or JSONL) into the classic metadata/results shape.
+
+    Near-duplicate records are folded into the `near_duplicates` list of the
+    result they duplicate.
+    """
+    metadata: Optional[Dict] = None
+    results: List[Dict] = []
+    duplicates: List[Dict] = []
+    for record in iter_distilled(path):
+        record = dict(record)
+        record_type = record.pop("type", None)
+        if record_type == "metadata":
+            metadata = record
+        elif record_type == "result":
+            results.append(record)
+        elif record_type == "duplicate":
+            duplicates.append(record)
+
+    by_url = {result.get("url"): result for result in results}
+    for duplicate in duplicates:
+        canonical = by_url.get(duplicate["duplicate_of"])
+        # The canonical page's analysis may have failed; its duplicates can be retried next run
+        if canonical is not None:
+            canonical.setdefault("near_duplicates", []).append(
+                {"url": duplicate["url"], "similarity": duplicate.get("similarity")}
+            )
+
+    metadata = metadata or {}
+    metadata["total_results_processed"] = len(results)
+    metadata["near_duplicates_skipped"] = sum(len(result.get("near_duplicates", [])) for result in results)
+    metadata["last_updated"] = str(Path(path).stat().st_mtime)
+    return {"metadata": metadata, "results": results}
@@ -0,0 +1,185 @@
+# extractors.py
+import abc
+import codecs
+import re
+from typing import Dict, Iterator, List, Optional, Type
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # Optional fast backend
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:  # Optional fast backend
+    SelectolaxParser = None
+
+try:
+    from charset_normalizer import from_bytes as detect_charset
+except ImportError:  # Installed with requests, but only needed for undeclared legacy encodings
+    detect_charset = None
+
+# Elements whose text is boilerplate rather than page content
+BOILERPLATE_TAGS = ['script', 'style', 'header', 'footer', 'nav']
+
+_CHARSET_HEADER = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_CHARSET_META = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def _known_encoding(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def detect_encoding(body: bytes, content_type: Optional[str] = None) -> str:
+    """Pick a text encoding for a page body without statistical guessing where possible.
+
+    Checks, in order: byte order mark, the Content-Type charset, a <meta>
+    charset in the first few KB, and a strict UTF-8 decode. Only bodies
+    that are none of these fall back to charset detection on a sample.
+    """
+    for bom, encoding in _BOMS:
+        if body.startswith(bom):
+            return encoding
+
+    if content_type:
+        match = _CHARSET_HEADER.search(content_type)
+        encoding = _known_encoding(match.group(1)) if match else None
+        if encoding:
+            return encoding
+
+    match = _CHARSET_META.search(body[:4096])
+    encoding = _known_encoding(match.group(1).decode('ascii', 'ignore')) if match else None
+    if encoding:
+        return encoding
+
+    try:
+        body.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    if detect_charset is not None:
+        best = detect_charset(body[:16384]).best()
+        if best is not None:
+            return best.encoding
+    return 'cp1252'
+
+
+class HTMLExtractor(abc.ABC):
+    """Turns an HTML document into newline-separated visible text"""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def extract(self, html: str) -> str:
+        """Return the visible text of a document, one text node per line"""
+
+
+class BeautifulSoupExtractor(HTMLExtractor):
+    """Reference backend: BeautifulSoup with the pure-Python html.parser"""
+
+    name = "bs4"
+
+    def extract(self, html: str) -> str:
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Remove script and style elements
+        for element in soup(BOILERPLATE_TAGS):
+            element.decompose()
+
+        return soup.get_text(separator='\n', strip=True)
+
+
+class LxmlExtractor(HTMLExtractor):
+    """Fast backend built on lxml's C HTML parser"""
+
+    name = "lxml"
+
+    def __init__(self):
+        # lxml keeps <template> contents as ordinary children; the other backends drop them
+        self.skip_tags = set(BOILERPLATE_TAGS) | {'template'}
+
+    def _iter_strings(self, root) -> Iterator[str]:
+        """Yield text nodes in document order, like BeautifulSoup's string generator"""
+        walker = etree.iterwalk(root, events=('start', 'end'))
+        for event, element in walker:
+            # Comments and processing instructions have a non-string tag
+            skip = not isinstance(element.tag, str) or element.tag in self.skip_tags
+            if event == 'start':
+                if skip:
+                    walker.skip_subtree()
+                elif element.text:
+                    yield element.text
+            elif element.tail and element is not root:
+                yield element.tail
+
+    def extract(self, html: str) -> str:
+        if not html.strip():
+            return ""
+        try:
+            # lxml parser objects are not thread-safe, so each call gets its own
+            parser = lxml.html.HTMLParser(encoding='utf-8')
+            root = lxml.html.document_fromstring(html.encode('utf-8'), parser=parser)
+        except etree.ParserError:
+            return ""
+        texts = (text.strip() for text in self._iter_strings(root))
+        return '\n'.join(text for text in texts if text)
+
+
+class SelectolaxExtractor(HTMLExtractor):
+    """Fast backend built on selectolax (lexbor)"""
+
+    name = "selectolax"
+
+    def extract(self, html: str) -> str:
+        tree = SelectolaxParser(html)
+        tree.strip_tags(BOILERPLATE_TAGS)
+        if tree.root is None:
+            return ""
+        texts = (node.text(deep=False).strip() for node in tree.root.traverse(include_text=True) if node.tag == '-text')
+        return '\n'.join(text for text in texts if text)
+
+
+EXTRACTORS: Dict[str, Type[HTMLExtractor]] = {
+    "bs4": BeautifulSoupExtractor,
+    "lxml": LxmlExtractor,
+    "selectolax": SelectolaxExtractor,
+}
+
+
+def available_extractors() -> List[str]:
+    """Names of the backends whose dependencies are installed, slowest first"""
+    names = ["bs4"]
+    if lxml is not None:
+        names.append("lxml")
+    if SelectolaxParser is not None:
+        names.append("selectolax")
+    return names
+
+
+def get_extractor(name: str = "auto") -> HTMLExtractor:
+    """Create an extractor by name; 'auto' picks the fastest installed backend.
+
+    The fast backends follow the HTML5 parsing rules, so unlike bs4 they drop
+    CDATA sections outside SVG/MathML; lxml also drops them inside SVG.
+    """
+    if name == "auto":
+        name = available_extractors()[-1]
+    if name not in available_extractors():
+        raise ValueError(f"HTML extractor '{name}' is not available (installed: {', '.join(available_extractors())})")
+    return EXTRACTORS[name]()
@@ -0,0 +1,51 @@
+# fetcher.py
+import threading
+from time import monotonic, sleep
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at a fixed rate"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            sleep(wait)
+
+
+class HostRateLimiter:
+    """Per-host politeness: one token bucket for every host we talk to"""
+
+    def __init__(self, rate_per_host: float = 0.5, burst: float = 1.0):
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url: str) -> None:
+        """Wait until the host of `url` may be contacted again"""
+        if self.rate_per_host <= 0:
+            return
+        host = urlparse(url).netloc.lower()
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_per_host, self.burst)
+                self.buckets[host] = bucket
+        bucket.acquire()
@@ -0,0 +1,98 @@
+# llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class LLMCache:
+    """SQLite-backed cache of LLM completions shared by every LLM call site.
+
+    Entries are keyed on a hash of the model, messages, max_tokens and
+    temperature of the request, so repeated or resumed jobs reuse earlier
+    inference. With `bypass` set (or LLM_CACHE_BYPASS=1 in the environment)
+    lookups always miss but fresh responses are still stored.
+    """
+
+    def __init__(self, path: str = "results/llm_cache.sqlite3",
+                 max_entries: int = 100000,
+                 bypass: bool = False,
+                 recount_every: int = 1000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        # Other processes (batch mode) may share the file, so the running count is resynced now and then
+        self.recount_every = recount_every
+        self.puts = 0
+        self.bypass = bypass or os.environ.get("LLM_CACHE_BYPASS", "") not in ("", "0")
+        self.lock = threading.Lock()
+
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+            self.db.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at)")
+            self.count = self.db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    @staticmethod
+    def make_key(payload: Dict) -> str:
+        """Hash the parts of a chat completion request that determine its output"""
+        relevant = {
+            "model": payload.get("model"),
+            "messages": payload.get("messages"),
+            "max_tokens": payload.get("max_tokens"),
+            "temperature": payload.get("temperature")
+        }
+        encoded = json.dumps(relevant, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def get(self, payload: Dict) -> Optional[str]:
+        """Return the cached completion for a request payload, if any"""
+        if self.bypass:
+            return None
+        key = self.make_key(payload)
+        with self.lock, self.db:
+            row = self.db.execute("SELECT content FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, payload: Dict, content: str) -> None:
+        """Store the completion for a request payload"""
+        key = self.make_key(payload)
+        now = time.time()
+        with self.lock, self.db:
+            exists = self.db.execute("SELECT 1 FROM completions WHERE key = ?", (key,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO completions (key, content, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, content, now, now)
+            )
+            if not exists:
+                self.count += 1
+            self.puts += 1
+            if self.puts % self.recount_every == 0:
+                self.count = self.db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        if self.count > self.max_entries:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop least recently used entries beyond max_entries"""
+        with self.lock, self.db:
+            excess = self.count - self.max_entries
+            if excess > 0:
+                deleted = self.db.execute(
+                    "DELETE FROM completions WHERE key IN "
+                    "(SELECT key FROM completions ORDER BY accessed_at ASC LIMIT ?)",
+                    (excess,)
+                ).rowcount
+                self.count -= deleted
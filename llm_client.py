@@ -0,0 +1,392 @@
+# llm_client.py
+import json
+import logging
+import random
+import threading
+from collections import deque
+from time import monotonic, sleep
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from llm_cache import LLMCache
+
+# Status codes worth retrying: rate limiting and server-side failures
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ThinkStripper:
+    """Incrementally remove <think>...</think> blocks from streamed text"""
+
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+
+    def __init__(self):
+        self.buffer = ""
+        self.in_think = False
+        self.started = False
+
+    @staticmethod
+    def _partial_tag_length(text: str, tag: str) -> int:
+        """Length of the longest suffix of `text` that could be the start of `tag`"""
+        for length in range(min(len(tag) - 1, len(text)), 0, -1):
+            if tag.startswith(text[-length:]):
+                return length
+        return 0
+
+    def feed(self, text: str) -> str:
+        """Consume a piece of streamed text and return what is safe to emit"""
+        self.buffer += text
+        output = []
+        while self.buffer:
+            if self.in_think:
+                end = self.buffer.find(self.CLOSE_TAG)
+                if end == -1:
+                    # Drop the thinking text but keep a possible partial closing tag
+                    keep = self._partial_tag_length(self.buffer, self.CLOSE_TAG)
+                    self.buffer = self.buffer[len(self.buffer) - keep:]
+                    break
+                self.buffer = self.buffer[end + len(self.CLOSE_TAG):]
+                self.in_think = False
+            else:
+                start = self.buffer.find(self.OPEN_TAG)
+                if start == -1:
+                    keep = self._partial_tag_length(self.buffer, self.OPEN_TAG)
+                    output.append(self.buffer[:len(self.buffer) - keep])
+                    self.buffer = self.buffer[len(self.buffer) - keep:]
+                    break
+                output.append(self.buffer[:start])
+                self.buffer = self.buffer[start + len(self.OPEN_TAG):]
+                self.in_think = True
+        return self._trim_leading("".join(output))
+
+    def flush(self) -> str:
+        """Return any text still held back at the end of the stream"""
+        remaining = "" if self.in_think else self.buffer
+        self.buffer = ""
+        return self._trim_leading(remaining)
+
+    def _trim_leading(self, text: str) -> str:
+        # Skip whitespace before the first visible text, like the non-streaming strip()
+        if not self.started:
+            text = text.lstrip()
+            self.started = bool(text)
+        return text
+
+
+class CircuitOpenError(Exception):
+    """Raised when the LLM endpoint has failed too often and calls are being short-circuited"""
+
+
+class CircuitBreaker:
+    """Stop hammering an endpoint after repeated consecutive failures"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            # Half-open: after the cool-down let a single trial request through
+            if monotonic() - self.opened_at >= self.reset_timeout and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = monotonic()
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for one LLM endpoint.
+
+    The limit grows by about one slot per round of successful requests while
+    latency stays flat, and is cut multiplicatively on timeouts, 429/5xx
+    responses or latency spikes. A spike is a moving average of latency well
+    above the lowest moving average seen, since single completions vary a lot
+    with their length. Callers still need enough
+    threads to use a higher limit; the limiter only ever holds them back.
+    """
+
+    def __init__(self, initial_limit: float = 1, min_limit: float = 1, max_limit: float = 32,
+                 backoff: float = 0.5, latency_tolerance: float = 2.0, window: int = 200):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.latency_average: Optional[float] = None
+        self.latency_floor: Optional[float] = None
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.decreases = 0
+        self.condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """Wait for a free slot; returns the start time to hand back to `release`"""
+        with self.condition:
+            while self.in_flight >= max(1, int(self.limit)):
+                self.condition.wait()
+            self.in_flight += 1
+            return monotonic()
+
+    def release(self, started: float, ok: bool = True, sample: bool = True) -> None:
+        """Free a slot and adjust the limit from the request's outcome.
+
+        `ok=False` marks an overload signal (timeout, 429, 5xx). `sample=False`
+        frees the slot without treating the latency as a measurement.
+        """
+        latency = monotonic() - started
+        with self.condition:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+
+            if ok and sample:
+                self.latencies.append(latency)
+                if self.latency_average is None:
+                    self.latency_average = self.latency_floor = latency
+                else:
+                    self.latency_average += (latency - self.latency_average) * 0.3
+                    # The floor follows improvements at once and a changed workload only slowly
+                    if self.latency_average < self.latency_floor:
+                        self.latency_floor = self.latency_average
+                    else:
+                        self.latency_floor += (self.latency_average - self.latency_floor) * 0.001
+                spike = self.latency_average > self.latency_floor * self.latency_tolerance
+            else:
+                spike = False
+
+            if not ok or spike:
+                # Requests already in flight when we backed off can't confirm the cut was enough
+                if started >= self.last_decrease and self.limit > self.min_limit:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.last_decrease = monotonic()
+                    self.decreases += 1
+                    # Judge the new limit on fresh measurements only
+                    self.latency_average = self.latency_floor
+            elif sample and saturated:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    def _percentile(self, ordered: List[float], fraction: float) -> Optional[float]:
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit and latency percentiles over the recent window, in seconds"""
+        with self.condition:
+            ordered = sorted(self.latencies)
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "decreases": self.decreases,
+                "samples": len(ordered),
+                "latency_p50": self._percentile(ordered, 0.5),
+                "latency_p90": self._percentile(ordered, 0.9),
+                "latency_p99": self._percentile(ordered, 0.99)
+            }
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(llm_url: str) -> AdaptiveLimiter:
+    """The process-wide limiter for an endpoint, so every client of one server shares its limit"""
+    parsed = urlparse(llm_url)
+    key = f"{parsed.scheme}://{parsed.netloc}"
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = AdaptiveLimiter()
+        return _limiters[key]
+
+
+class LLMClient:
+    """Pooled client for an OpenAI-compatible chat completions endpoint.
+
+    Owns a keep-alive connection pool, per-request timeouts, retries with
+    jittered exponential backoff, a circuit breaker, the shared response
+    cache and the endpoint's adaptive concurrency limiter, so every entry
+    point talks to the LLM the same way.
+    """
+
+    def __init__(self, llm_url: str = "http://127.0.0.1:5000/v1/chat/completions",
+                 model: str = "gpt-3.5-turbo",
+                 timeout: float = 60,
+                 connect_timeout: float = 10,
+                 max_retries: int = 3,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 30.0,
+                 pool_size: int = 8,
+                 cache: Optional[LLMCache] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 limiter: Optional[AdaptiveLimiter] = None):
+        self.llm_url = llm_url
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter or get_limiter(llm_url)
+        # Cleared once the server rejects a `response_format` field
+        self.structured_output = True
+        self.logger = logging.getLogger(__name__)
+
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def build_payload(self, messages: List[Dict[str, str]],
+                      max_tokens: Optional[int] = None,
+                      temperature: Optional[float] = None,
+                      model: Optional[str] = None,
+                      **extra: Any) -> Dict[str, Any]:
+        """Assemble a chat completion request body"""
+        payload: Dict[str, Any] = {"model": model or self.model, "messages": messages}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        if temperature is not None:
+            payload["temperature"] = temperature
+        payload.update(extra)
+        return payload
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(self, payload: Dict[str, Any], **kwargs: Any) -> requests.Response:
+        """POST a payload with retries, backoff and circuit breaking"""
+        for attempt in range(self.max_retries):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"LLM endpoint {self.llm_url} is failing; circuit open")
+            started = self.limiter.acquire()
+            try:
+                response = self.session.post(
+                    self.llm_url,
+                    json=payload,
+                    timeout=(self.connect_timeout, self.timeout),
+                    **kwargs
+                )
+                if response.status_code in RETRYABLE_STATUS:
+                    response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                self.limiter.release(started, ok=False)
+                self.breaker.record_failure()
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = self._backoff(attempt)
+                self.logger.warning(
+                    f"LLM request failed ({str(e)}), retry {attempt + 1}/{self.max_retries - 1} in {delay:.1f}s"
+                )
+                sleep(delay)
+                continue
+            except Exception:
+                self.limiter.release(started, sample=False)
+                # Every exit has to settle the breaker, or a failed half-open trial keeps it open for good
+                self.breaker.record_failure()
+                raise
+
+            # A streamed response has only sent its headers, so its latency says little about load
+            self.limiter.release(started, sample=response.ok and not kwargs.get("stream"))
+            # The server answered, so it is reachable even if it rejected this particular request
+            self.breaker.record_success()
+            # Anything else (e.g. 400 for an oversized prompt) will not get better by retrying
+            response.raise_for_status()
+            return response
+
+    def chat(self, messages: List[Dict[str, str]],
+             max_tokens: Optional[int] = None,
+             temperature: Optional[float] = None,
+             model: Optional[str] = None,
+             use_cache: bool = True,
+             validate: Optional[Callable[[str], Any]] = None,
+             **extra: Any) -> str:
+        """Return the completion text for a chat request.
+
+        If `validate` is given it is called on the completion before caching,
+        and any exception it raises propagates without the response being
+        cached. A `response_format` the server rejects is dropped for this
+        and all later requests if the request then succeeds without it.
+        """
+        if not self.structured_output:
+            extra.pop("response_format", None)
+        payload = self.build_payload(messages, max_tokens, temperature, model, **extra)
+        cache = self.cache if use_cache else None
+
+        content = cache.get(payload) if cache else None
+        if content is not None:
+            return content
+
+        try:
+            response = self.post(payload)
+        except requests.HTTPError as e:
+            if "response_format" not in payload or e.response is None or e.response.status_code not in (400, 422):
+                raise
+            # A 400 may be about something else entirely (e.g. context length), so only give up on
+            # response_format once the same request succeeds without it
+            unconstrained = {key: value for key, value in extra.items() if key != "response_format"}
+            content = self.chat(messages, max_tokens, temperature, model, use_cache, validate, **unconstrained)
+            self.structured_output = False
+            self.logger.warning(f"LLM endpoint rejected response_format ({str(e)}); using unconstrained output")
+            return content
+        content = response.json()["choices"][0]["message"]["content"]
+        if validate:
+            validate(content)
+        if cache:
+            cache.put(payload, content)
+        return content
+
+    def stream_chat(self, messages: List[Dict[str, str]],
+                    max_tokens: Optional[int] = None,
+                    temperature: Optional[float] = None,
+                    model: Optional[str] = None,
+                    **extra: Any) -> Iterator[str]:
+        """Yield completion text deltas from a streaming (SSE) chat request.
+
+        The read timeout applies between received chunks rather than to the
+        whole completion, so long generations on slow backends do not time out.
+        Retries only cover establishing the stream.
+        """
+        payload = self.build_payload(messages, max_tokens, temperature, model, stream=True, **extra)
+        response = self.post(payload, stream=True)
+        try:
+            # chunk_size=None hands over each chunk as soon as the server sends it
+            for raw_line in response.iter_lines(chunk_size=None):
+                line = raw_line.decode('utf-8', errors='replace')
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+        finally:
+            response.close()
@@ -0,0 +1,153 @@
+# llm_json.py
+import json
+from typing import Any, Dict, Iterable, List
+
+from llm_client import ThinkStripper
+
+_CLOSERS = {'{': '}', '[': ']'}
+_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+
+def string_list_schema(*keys: str) -> Dict[str, Any]:
+    """JSON schema for an object with one array of strings per key, e.g. entity lists"""
+    return {
+        "type": "object",
+        "properties": {key: {"type": "array", "items": {"type": "string"}} for key in keys},
+        "required": list(keys),
+        "additionalProperties": False
+    }
+
+
+def json_response_format(schema: Dict[str, Any], name: str = "response") -> Dict[str, Any]:
+    """`response_format` request field asking the server to constrain output to a JSON schema.
+
+    OpenAI and llama.cpp-style servers turn the schema into a grammar, so the
+    completion is valid JSON of the requested shape by construction.
+    """
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+def _closes_string(text: str, position: int) -> bool:
+    """Whether a quote is followed by what may come after a string, rather than being part of it"""
+    rest = text[position:position + 64].lstrip()
+    return not rest or rest[0] in ',:}]'
+
+
+def _repair(text: str) -> str:
+    """Rewrite noisy or truncated JSON-ish text into parseable JSON in one pass.
+
+    Starts at the first `{` or `[` and stops once that value is closed, so
+    code fences and chatter around it are ignored. Fixes raw control
+    characters, unescaped quotes, single-quoted strings and trailing commas.
+    Output cut off mid-value (e.g. at max_tokens) drops the incomplete last
+    element and closes every open container.
+    """
+    start = min((i for i in (text.find('{'), text.find('[')) if i >= 0), default=-1)
+    if start < 0:
+        return text
+
+    out: List[str] = []
+    stack: List[str] = []
+    # Per open container: output length just after its opener or its last comma
+    boundaries: List[int] = []
+    quote = None
+    escaped = False
+
+    def drop_trailing_comma() -> None:
+        while out and out[-1].isspace():
+            out.pop()
+        if out and out[-1] == ',':
+            out.pop()
+
+    for index in range(start, len(text)):
+        char = text[index]
+        if quote:
+            if escaped:
+                # JSON has no \' escape
+                if char == "'":
+                    out[-1] = char
+                else:
+                    out.append(char)
+                escaped = False
+            elif char == '\\':
+                out.append(char)
+                escaped = True
+            elif char == quote and _closes_string(text, index + 1):
+                out.append('"')
+                quote = None
+            elif char == "'":
+                out.append(char)
+            elif char == '"':
+                out.append('\\"')
+            elif char < ' ':
+                out.append(_ESCAPES.get(char, f'\\u{ord(char):04x}'))
+            else:
+                out.append(char)
+        elif char in '"\'':
+            quote = char
+            out.append('"')
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+            out.append(char)
+            boundaries.append(len(out))
+        elif char in '}]':
+            if char not in stack:
+                continue
+            # Close anything left open inside the container the model just closed
+            while stack:
+                drop_trailing_comma()
+                closer = stack.pop()
+                boundaries.pop()
+                out.append(closer)
+                if closer == char:
+                    break
+            if not stack:
+                return ''.join(out)
+        elif char == ',':
+            out.append(char)
+            boundaries[-1] = len(out)
+        else:
+            out.append(char)
+
+    # Truncated: a partial last element (e.g. half an entity name) is dropped rather than guessed
+    if quote or not _parses(''.join(out) + ''.join(reversed(stack))):
+        del out[boundaries[-1]:]
+    drop_trailing_comma()
+    return ''.join(out) + ''.join(reversed(stack))
+
+
+def _parses(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def parse_json_object(content: str) -> Dict[str, Any]:
+    """Parse the JSON object in an LLM response, tolerating noise and truncation.
+
+    Well-formed responses take the plain `json.loads` path; only malformed
+    ones are repaired. Raises `json.JSONDecodeError` if no object can be
+    recovered, so the response is not cached and the chunk can be retried.
+    """
+    stripper = ThinkStripper()
+    content = (stripper.feed(content) + stripper.flush()).strip()
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        data = json.loads(_repair(content))
+    if not isinstance(data, dict):
+        raise json.JSONDecodeError("Expected a JSON object", content, 0)
+    return data
+
+
+def string_lists(data: Dict[str, Any], keys: Iterable[str]) -> Dict[str, List[str]]:
+    """Pick the given keys from parsed output as lists of strings, dropping anything else"""
+    lists = {}
+    for key in keys:
+        values = data.get(key) or []
+        if isinstance(values, str):
+            values = [values]
+        lists[key] = [value for value in values if isinstance(value, str)] if isinstance(values, list) else []
+    return lists
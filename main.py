@@ -1,7 +1,9 @@
 # main.py
 import argparse
 from search import DossierBuilder
+from distilled_store import iter_distilled
 from pathlib import Path
+from itertools import chain
 from typing import List
 import sys
 from concurrent.futures import ProcessPoolExecutor
@@ -13,7 +15,31 @@ def process_single_target(args: argparse.Namespace, target: str, additional_term
         builder = DossierBuilder(
             max_page_tokens=args.page_tokens,
             max_dossier_tokens=args.dossier_tokens,
-            timeout=args.timeout
+            timeout=args.timeout,
+            fetch_workers=args.fetch_workers,
+            extract_workers=args.extract_workers,
+            analyze_workers=args.analyze_workers,
+            queue_size=args.queue_size,
+            page_cache_dir=None if args.no_page_cache else args.page_cache_dir,
+            search_cache_path=None if args.no_search_cache else "results/search_cache.sqlite3",
+            search_cache_ttl=args.search_cache_ttl * 3600,
+            page_cache_ttl=args.page_cache_ttl,
+            page_cache_max_bytes=args.page_cache_max_mb * 1024 * 1024,
+            bypass_llm_cache=args.bypass_llm_cache,
+            stream_dossier=args.stream,
+            context_tokens=args.context_tokens,
+            reduce_workers=args.reduce_workers,
+            page_input_tokens=args.page_input_tokens,
+            tokenizer_path=args.tokenizer,
+            resume=not args.fresh,
+            html_extractor=args.html_extractor,
+            max_page_bytes=args.max_page_mb * 1024 * 1024,
+            near_dup_threshold=args.near_dup_threshold,
+            rank=args.rank,
+            min_score=args.min_score,
+            max_analyze=args.max_analyze,
+            batch_pages=args.batch_pages,
+            host_rate=args.host_rate
         )
         
         print(f"\nProcessing target: {target}")
@@ -30,16 +56,21 @@ def process_single_target(args: argparse.Namespace, target: str, additional_term
         else:
             # Perform initial search
             print("Performing initial search...")
-            results = builder.search(target, additional_terms, args.site, args.max_results)
+            results = builder.iter_search(target, additional_terms, args.site, args.max_results)
             
-            if not results:
+            # Wait only for the first hit; the rest stream into the pipeline as they arrive
+            first_result = next(results, None)
+            if first_result is None:
                 print(f"No results found for {target}")
                 return
+            results = chain([first_result], results)
                 
             # Process each result
             print("Processing search results and analyzing web pages...")
             print("This may take some time. Progress will be saved after each page.")
-            distilled_path = builder.process_search_results(results, target)
+            if not args.fresh:
+                print("Already analyzed pages from an earlier run will be skipped.")
+            distilled_path = builder.process_search_results(results, target, additional_terms)
         
         # Generate final dossier
         print("Generating final comprehensive dossier...")
@@ -94,31 +125,33 @@ def save_batch_summary(targets: List[str], args: argparse.Namespace):
         json.dump(summary, f, indent=2)
 
 def validate_distilled_file(file_path: str) -> bool:
-    """Validate the structure of a distilled results file"""
+    """Validate the structure of a distilled results file (JSON or JSONL)"""
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-            
-        # Check for required structure
-        if not isinstance(data, dict):
-            return False
-            
-        required_keys = {"metadata", "results"}
-        if not all(key in data for key in required_keys):
-            return False
-            
-        if not isinstance(data["results"], list):
-            return False
-            
-        # Check if results have required fields
-        for result in data["results"]:
+        has_metadata = False
+        
+        # Records are read one at a time so large JSONL stores are never fully loaded
+        for record in iter_distilled(Path(file_path)):
+            if not isinstance(record, dict):
+                return False
+                
+            if record.get("type") == "metadata":
+                has_metadata = True
+                continue
+
+            # Near-duplicates skipped during analysis only point at the result they duplicate
+            if record.get("type") == "duplicate":
+                if not all(key in record for key in ("url", "duplicate_of")):
+                    return False
+                continue
+                
+            # Check if results have required fields
             required_result_keys = {"result_number", "url", "analysis"}
-            if not all(key in result for key in required_result_keys):
+            if not all(key in record for key in required_result_keys):
                 return False
                 
-        return True
+        return has_metadata
         
-    except (json.JSONDecodeError, OSError):
+    except (json.JSONDecodeError, OSError, ValueError):
         return False
 
 def main():
@@ -160,9 +193,62 @@ Note: The targets file should contain one target identifier per line.
     parser.add_argument("-s", "--site", help="Restrict search to specific site (e.g., twitter.com)")
     parser.add_argument("--parallel", action="store_true",
                         help="Enable parallel processing for batch targets")
-    parser.add_argument("--load-distilled", help="Path to existing distilled results JSON file")
+    parser.add_argument("--load-distilled", help="Path to existing distilled results file (.json or .jsonl)")
     parser.add_argument("--timeout", type=int, default=60,
                         help="Timeout in seconds for LLM API calls (default: 60)")
+    parser.add_argument("--fetch-workers", type=int, default=8,
+                        help="Number of pages downloaded concurrently (default: 8)")
+    parser.add_argument("--extract-workers", type=int, default=2,
+                        help="Number of workers extracting text from pages (default: 2)")
+    parser.add_argument("--analyze-workers", type=int, default=4,
+                        help="Maximum concurrent LLM page analyses; the actual concurrency adapts to "
+                             "the endpoint's latency (default: 4)")
+    parser.add_argument("--queue-size", type=int, default=16,
+                        help="Maximum items waiting between pipeline stages (default: 16)")
+    parser.add_argument("--page-cache-dir", default="results/page_cache",
+                        help="Directory for the downloaded page cache (default: results/page_cache)")
+    parser.add_argument("--page-cache-ttl", type=float, default=24 * 3600,
+                        help="Seconds before a cached page is revalidated (default: 86400)")
+    parser.add_argument("--page-cache-max-mb", type=int, default=512,
+                        help="Maximum size of the page cache in MB (default: 512)")
+    parser.add_argument("--search-cache-ttl", type=float, default=6,
+                        help="Hours to reuse cached search engine results for an identical search (default: 6)")
+    parser.add_argument("--no-search-cache", action="store_true",
+                        help="Always query the search engine instead of using cached results")
+    parser.add_argument("--no-page-cache", action="store_true",
+                        help="Always download pages instead of using the page cache")
+    parser.add_argument("--bypass-llm-cache", action="store_true",
+                        help="Ignore cached LLM responses (new responses are still cached)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the final dossier to disk as it is generated")
+    parser.add_argument("--context-tokens", type=int, default=32768,
+                        help="Context window of the LLM, used to size dossier prompts (default: 32768)")
+    parser.add_argument("--reduce-workers", type=int, default=2,
+                        help="Concurrent partial summaries when condensing large result sets (default: 2)")
+    parser.add_argument("--html-extractor", default="auto", choices=["auto", "selectolax", "lxml", "bs4"],
+                        help="Backend for extracting page text; auto picks the fastest installed (default: auto)")
+    parser.add_argument("--max-page-mb", type=int, default=10,
+                        help="Largest page or document to download, in MB (default: 10)")
+    parser.add_argument("--near-dup-threshold", type=float, default=0.85,
+                        help="Similarity (0-1) above which a page is skipped as a near-duplicate of an "
+                             "already analyzed page; 0 disables the check (default: 0.85)")
+    parser.add_argument("--rank", action="store_true",
+                        help="Fetch all results first and analyze them in order of BM25 relevance to the query")
+    parser.add_argument("--min-score", type=float, default=0.0,
+                        help="With --rank, skip pages scoring below this fraction of the best page's score (default: 0)")
+    parser.add_argument("--max-analyze", type=int,
+                        help="With --rank, analyze at most this many of the highest scoring pages")
+    parser.add_argument("--batch-pages", type=int, default=1,
+                        help="Analyze up to this many short pages in one LLM request when their text fits "
+                             "the page input budget together (default: 1, no batching)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Discard saved progress for the target instead of resuming")
+    parser.add_argument("--page-input-tokens", type=int, default=2000,
+                        help="Maximum tokens of page text sent for each page analysis (default: 2000)")
+    parser.add_argument("--tokenizer",
+                        help="Path to a tokenizer.json matching the model, for exact token counts")
+    parser.add_argument("--host-rate", type=float, default=0.5,
+                        help="Maximum requests per second to any single host (default: 0.5)")
     
     args = parser.parse_args()
 
@@ -0,0 +1,120 @@
+# near_dup.py
+import hashlib
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+FINGERPRINT_BITS = 64
+
+_WORDS = re.compile(r"\w+")
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash fingerprint of a text over the set of its overlapping word shingles.
+
+    Texts that share most of their shingles get fingerprints that differ in
+    only a few bits, so Hamming distance approximates textual similarity.
+    Each distinct shingle counts once: phrases repeated throughout a page
+    (templates, boilerplate) would otherwise pull unrelated pages together.
+    """
+    words = _WORDS.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = {' '.join(words)} if words else set()
+    else:
+        shingles = {' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+
+    totals = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        feature = _feature_hash(shingle)
+        for bit in range(FINGERPRINT_BITS):
+            if feature >> bit & 1:
+                totals[bit] += 1
+            else:
+                totals[bit] -= 1
+
+    fingerprint = 0
+    for bit, total in enumerate(totals):
+        if total > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    """Thread-safe SimHash index that finds earlier pages nearly identical to a new one.
+
+    `threshold` is the minimum similarity (1 - differing bits / 64) for two
+    pages to count as near-duplicates. The default of 0.85 allows 9 differing
+    bits: the same article under different titles and chrome lands within 8
+    bits from about 200 words up, while unrelated pages are 15 or more apart.
+    Fingerprints are split into bands so a lookup only compares against pages
+    sharing at least one band exactly, which is guaranteed for every pair
+    within the allowed distance.
+    """
+
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+        self.max_distance = int((1 - threshold) * FINGERPRINT_BITS)
+        self.bands = self.max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.bands
+        self.buckets: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in range(self.bands)]
+        self.lock = threading.Lock()
+        self.indexed = 0
+        self.seeded = 0
+        self.duplicates = 0
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        keys = []
+        for band in range(self.bands):
+            shift = band * self.band_bits
+            # The last band takes any bits left over by the integer division
+            bits = FINGERPRINT_BITS - shift if band == self.bands - 1 else self.band_bits
+            keys.append(fingerprint >> shift & ((1 << bits) - 1))
+        return keys
+
+    def _add(self, key: str, fingerprint: int, band_keys: List[int]) -> None:
+        for band, band_key in enumerate(band_keys):
+            self.buckets[band].setdefault(band_key, []).append((fingerprint, key))
+        self.indexed += 1
+
+    def add(self, key: str, fingerprint: int) -> None:
+        """Index a page fingerprinted earlier, e.g. one analyzed by an interrupted run"""
+        with self.lock:
+            self._add(key, fingerprint, self._band_keys(fingerprint))
+            self.seeded += 1
+
+    def check_and_add(self, key: str, fingerprint: int) -> Optional[Tuple[str, float]]:
+        """Return (canonical key, similarity) if the `simhash` fingerprint nearly matches an indexed
+        page, otherwise index it under `key` and return None"""
+        band_keys = self._band_keys(fingerprint)
+
+        with self.lock:
+            best: Optional[Tuple[int, str]] = None
+            for band, band_key in enumerate(band_keys):
+                for candidate, candidate_key in self.buckets[band].get(band_key, []):
+                    distance = hamming_distance(fingerprint, candidate)
+                    if distance <= self.max_distance and (best is None or distance < best[0]):
+                        best = (distance, candidate_key)
+
+            if best is not None:
+                self.duplicates += 1
+                return best[1], round(1 - best[0] / FINGERPRINT_BITS, 4)
+
+            self._add(key, fingerprint, band_keys)
+            return None
+
+    def stats(self) -> Dict[str, float]:
+        with self.lock:
+            return {
+                "threshold": self.threshold,
+                "indexed": self.indexed,
+                "seeded": self.seeded,
+                "near_duplicates": self.duplicates
+            }
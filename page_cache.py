@@ -0,0 +1,190 @@
+# page_cache.py
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+class PageCache:
+    """Content-addressed on-disk cache for downloaded pages and their extracted text.
+
+    Raw bodies and extracted text are stored as blobs named by the SHA-256 of
+    their content, so identical pages served from different URLs share storage.
+    A small SQLite index maps each URL to its blobs plus the validators
+    (ETag / Last-Modified) needed to revalidate it once the TTL has expired.
+    """
+
+    def __init__(self, cache_dir: str = "results/page_cache",
+                 ttl: float = 24 * 3600,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 compress: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        self.db = sqlite3.connect(str(self.cache_dir / "index.sqlite3"), timeout=30, check_same_thread=False)
+        with self.lock, self.db:
+            self.db.execute("""CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body_hash TEXT NOT NULL,
+                text_hash TEXT,
+                content_type TEXT,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+            self.db.execute("""CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                compressed INTEGER NOT NULL
+            )""")
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def _write_blob(self, data: bytes) -> Tuple[str, bytes]:
+        """Write a blob file under its content hash, returning the hash and the stored bytes.
+
+        The blob only becomes visible once `_index_blob` records it, in the same
+        transaction as the page row that refers to it.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        stored = zlib.compress(data, 6) if self.compress else data
+        if not self._blob_path(digest).exists():
+            self._write_blob_file(digest, stored)
+        return digest, stored
+
+    def _write_blob_file(self, digest: str, stored: bytes) -> None:
+        path = self._blob_path(digest)
+        path.parent.mkdir(exist_ok=True)
+        # Write to a temporary file first so readers never see a partial blob
+        tmp_path = path.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(stored)
+        os.replace(tmp_path, path)
+
+    def _index_blob(self, digest: str, stored: bytes) -> None:
+        """Record a blob; call with the lock held, inside the transaction that references it"""
+        # An eviction may have removed an identical orphaned blob since it was written
+        if not self._blob_path(digest).exists():
+            self._write_blob_file(digest, stored)
+        self.db.execute(
+            "INSERT OR REPLACE INTO blobs (hash, size, compressed) VALUES (?, ?, ?)",
+            (digest, len(stored), int(self.compress))
+        )
+
+    def read_blob(self, digest: str) -> Optional[bytes]:
+        """Load a blob by hash, or None if it is missing"""
+        with self.lock:
+            row = self.db.execute("SELECT compressed FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        try:
+            data = self._blob_path(digest).read_bytes()
+        except OSError:
+            return None
+        return zlib.decompress(data) if row[0] else data
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Return the cache entry for a URL, flagged as fresh or stale"""
+        with self.lock, self.db:
+            cursor = self.db.execute("SELECT * FROM pages WHERE url = ?", (url,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self.db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, url))
+
+        entry = dict(zip([column[0] for column in cursor.description], row))
+        entry["fresh"] = now - entry["fetched_at"] < self.ttl
+        return entry
+
+    def store_page(self, url: str, body: bytes, content_type: Optional[str] = None,
+                   encoding: Optional[str] = None, etag: Optional[str] = None,
+                   last_modified: Optional[str] = None) -> str:
+        """Store a freshly downloaded body for a URL"""
+        body_hash, stored = self._write_blob(body)
+        now = time.time()
+        with self.lock, self.db:
+            self._index_blob(body_hash, stored)
+            self.db.execute(
+                """INSERT OR REPLACE INTO pages
+                   (url, body_hash, text_hash, content_type, encoding, etag, last_modified, fetched_at, accessed_at)
+                   VALUES (?, ?, NULL, ?, ?, ?, ?, ?, ?)""",
+                (url, body_hash, content_type, encoding, etag, last_modified, now, now)
+            )
+        self.evict()
+        return body_hash
+
+    def store_text(self, url: str, text: str) -> None:
+        """Attach extracted text to an already cached URL"""
+        text_hash, stored = self._write_blob(text.encode('utf-8'))
+        with self.lock, self.db:
+            self._index_blob(text_hash, stored)
+            self.db.execute("UPDATE pages SET text_hash = ? WHERE url = ?", (text_hash, url))
+        self.evict()
+
+    def read_text(self, entry: Dict) -> Optional[str]:
+        """Load the extracted text for a cache entry, if any"""
+        if not entry.get("text_hash"):
+            return None
+        data = self.read_blob(entry["text_hash"])
+        return data.decode('utf-8') if data is not None else None
+
+    def mark_revalidated(self, url: str) -> None:
+        """Restart the TTL of an entry after a 304 Not Modified"""
+        with self.lock, self.db:
+            self.db.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def total_bytes(self) -> int:
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self) -> None:
+        """Drop least recently used pages until the cache fits in max_bytes"""
+        if self.total_bytes() <= self.max_bytes:
+            return
+
+        with self.lock, self.db:
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            while total > self.max_bytes:
+                # Drop pages until their blobs would cover the excess, then sweep orphans once;
+                # blobs shared with remaining pages survive, so repeat if that wasn't enough
+                pages = self.db.execute(
+                    """SELECT url, COALESCE(body.size, 0) + COALESCE(text.size, 0) FROM pages
+                       LEFT JOIN blobs AS body ON body.hash = pages.body_hash
+                       LEFT JOIN blobs AS text ON text.hash = pages.text_hash
+                       ORDER BY accessed_at ASC"""
+                ).fetchall()
+                if not pages:
+                    break
+                expected = total
+                for url, size in pages:
+                    if expected <= self.max_bytes:
+                        break
+                    self.db.execute("DELETE FROM pages WHERE url = ?", (url,))
+                    expected -= size
+
+                orphans = self.db.execute(
+                    """SELECT hash, size FROM blobs WHERE hash NOT IN (
+                           SELECT body_hash FROM pages
+                           UNION SELECT text_hash FROM pages WHERE text_hash IS NOT NULL
+                       )"""
+                ).fetchall()
+                for digest, size in orphans:
+                    self.db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                    self._blob_path(digest).unlink(missing_ok=True)
+                    total -= size
+
+        self.logger.info(f"Page cache evicted down to {self.total_bytes()} bytes")
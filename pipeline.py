@@ -0,0 +1,245 @@
+# pipeline.py
+import logging
+import queue
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Marks the end of the stream on a stage queue
+_DONE = object()
+
+
+class Stage:
+    """A single pipeline stage: a function run by a fixed number of worker threads.
+
+    With `batch_size` above 1 the function receives a list of up to that many
+    values and returns a list of results in the same order. A worker batches
+    whatever is already queued; `batch_fits(batch, value)` can refuse a value,
+    which then starts the next batch instead.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1,
+                 batch_size: int = 1,
+                 batch_fits: Optional[Callable[[List[Any], Any], bool]] = None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_fits = batch_fits
+        self.batches = 0
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def record_depth(self, depth: int) -> None:
+        """Record the input queue depth seen when a worker asks for work"""
+        with self.lock:
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def record_item(self, elapsed: float, dropped: bool) -> None:
+        with self.lock:
+            self.processed += 1
+            self.busy_seconds += elapsed
+            if dropped:
+                self.dropped += 1
+
+    def record_batch(self) -> None:
+        with self.lock:
+            self.batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "workers": self.workers,
+                **({"batches": self.batches} if self.batch_size > 1 else {}),
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "avg_queue_depth": round(self.depth_total / self.depth_samples, 2) if self.depth_samples else 0.0,
+                "max_queue_depth": self.depth_max
+            }
+
+
+class Pipeline:
+    """Run items through a chain of stages connected by bounded queues.
+
+    Every stage function takes the value produced by the previous stage and
+    returns the value for the next one, or None to drop the item. Results are
+    yielded in input order as (index, item, value), with value None for items
+    that were dropped along the way.
+
+    At most `window` items are in flight at once, so one slow item can only
+    let that many results pile up behind it while they wait to be yielded.
+    It defaults to twice the number of items all stages can work on at once.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 16,
+                 logger: Optional[logging.Logger] = None, window: Optional[int] = None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.window = window or 2 * sum(stage.workers * stage.batch_size for stage in stages)
+        self.next_index = 0
+        self.released = threading.Condition()
+        self.closed = False
+        self.logger = logger or logging.getLogger(__name__)
+        self.queues: List[queue.Queue] = []
+        self.remaining: List[int] = []
+        self.lock = threading.Lock()
+        self.error: Optional[BaseException] = None
+
+    def _feed(self, items: Iterable[Any]) -> None:
+        """Push input items into the first stage queue"""
+        try:
+            for index, item in enumerate(items):
+                # Wait until the item `window` places back has been yielded
+                with self.released:
+                    self.released.wait_for(lambda: index < self.next_index + self.window or self.closed)
+                    if self.closed:
+                        break
+                self.queues[0].put((index, item, item))
+        except Exception as e:
+            self.error = e
+        finally:
+            for _ in range(self.stages[0].workers):
+                self.queues[0].put(_DONE)
+
+    def _work(self, position: int) -> None:
+        """Worker loop for the stage at `position`"""
+        stage = self.stages[position]
+        inbox = self.queues[position]
+        outbox = self.queues[position + 1]
+
+        carry = None
+        done = False
+        while not done:
+            if carry is not None:
+                envelope, carry = carry, None
+            else:
+                stage.record_depth(inbox.qsize())
+                envelope = inbox.get()
+            if envelope is _DONE:
+                break
+
+            if stage.batch_size > 1:
+                batch = [envelope]
+                # Only take what is already waiting; never hold a batch open for more work
+                while len(batch) < stage.batch_size:
+                    try:
+                        extra = inbox.get_nowait()
+                    except queue.Empty:
+                        break
+                    if extra is _DONE:
+                        done = True
+                        break
+                    values = [queued[2] for queued in batch if queued[2] is not None]
+                    if extra[2] is not None and values and stage.batch_fits and not stage.batch_fits(values, extra[2]):
+                        carry = extra
+                        break
+                    batch.append(extra)
+                for result in self._run_batch(stage, batch):
+                    outbox.put(result)
+                continue
+
+            index, item, value = envelope
+            # Items dropped upstream pass straight through so ordering can advance
+            if value is not None:
+                start = monotonic()
+                try:
+                    value = stage.func(value)
+                except Exception as e:
+                    self.logger.error(f"Stage '{stage.name}' failed on item {index}: {str(e)}")
+                    value = None
+                stage.record_item(monotonic() - start, value is None)
+            outbox.put((index, item, value))
+
+        # The last worker of a stage closes the next queue
+        with self.lock:
+            self.remaining[position] -= 1
+            last_worker = self.remaining[position] == 0
+        if last_worker:
+            next_workers = self.stages[position + 1].workers if position + 1 < len(self.stages) else 1
+            for _ in range(next_workers):
+                outbox.put(_DONE)
+
+    def _run_batch(self, stage: Stage, batch: List[Tuple[int, Any, Any]]) -> List[Tuple[int, Any, Any]]:
+        """Apply a batching stage's function to the live values of a batch"""
+        live = [position for position, envelope in enumerate(batch) if envelope[2] is not None]
+        if not live:
+            return batch
+
+        start = monotonic()
+        try:
+            outputs = stage.func([batch[position][2] for position in live])
+        except Exception as e:
+            self.logger.error(f"Stage '{stage.name}' failed on items {[batch[position][0] for position in live]}: {str(e)}")
+            outputs = [None] * len(live)
+        elapsed = (monotonic() - start) / len(live)
+        stage.record_batch()
+
+        results = list(batch)
+        for position, value in zip(live, outputs):
+            index, item, _ = batch[position]
+            results[position] = (index, item, value)
+            stage.record_item(elapsed, value is None)
+        return results
+
+    def run(self, items: Iterable[Any]) -> Iterator[Tuple[int, Any, Any]]:
+        """Process items through all stages, yielding results in input order"""
+        self.queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        self.remaining = [stage.workers for stage in self.stages]
+        self.error = None
+        self.next_index = 0
+        self.closed = False
+
+        threads = [threading.Thread(target=self._feed, args=(items,), daemon=True)]
+        for position, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work, args=(position,), name=f"{stage.name}-{n}", daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        # Re-order completed items so callers see them in input order
+        pending: Dict[int, Tuple[int, Any, Any]] = {}
+        results = self.queues[-1]
+        try:
+            while True:
+                envelope = results.get()
+                if envelope is _DONE:
+                    break
+                pending[envelope[0]] = envelope
+                while self.next_index in pending:
+                    yield pending.pop(self.next_index)
+                    with self.released:
+                        self.next_index += 1
+                        self.released.notify()
+
+            for index in sorted(pending):
+                yield pending[index]
+        finally:
+            # Stop feeding if the caller abandons the results early
+            with self.released:
+                self.closed = True
+                self.released.notify()
+
+        if self.error:
+            raise self.error
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage throughput and queue-depth statistics"""
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def log_stats(self) -> None:
+        for name, stats in self.stats().items():
+            self.logger.info(
+                f"Stage '{name}': {stats['processed']} items ({stats['dropped']} dropped) "
+                f"with {stats['workers']} workers, busy {stats['busy_seconds']}s, "
+                f"queue depth avg {stats['avg_queue_depth']} / max {stats['max_queue_depth']}"
+            )
@@ -0,0 +1,53 @@
+# ranking.py
+import math
+import re
+from collections import Counter
+from typing import List
+
+_TERMS = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word terms of a text"""
+    return _TERMS.findall(text.lower())
+
+
+def bm25_scores(query: str, documents: List[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """Okapi BM25 score of every document against the query.
+
+    Statistics come from the documents themselves, so scores are only
+    comparable within one call. Only query terms are counted per document.
+    """
+    query_terms = set(tokenize(query))
+    if not documents or not query_terms:
+        return [0.0] * len(documents)
+
+    lengths = []
+    term_counts = []
+    for document in documents:
+        terms = tokenize(document)
+        lengths.append(len(terms))
+        term_counts.append(Counter(term for term in terms if term in query_terms))
+
+    average_length = sum(lengths) / len(lengths) or 1.0
+    document_frequency = Counter(term for counts in term_counts for term in counts)
+    idf = {
+        term: math.log((len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5) + 1)
+        for term in query_terms
+    }
+
+    scores = []
+    for length, counts in zip(lengths, term_counts):
+        score = 0.0
+        for term, frequency in counts.items():
+            score += idf[term] * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def relative_scores(scores: List[float]) -> List[float]:
+    """Scale scores so the best document scores 1.0"""
+    best = max(scores, default=0.0)
+    if best <= 0:
+        return [0.0] * len(scores)
+    return [round(score / best, 4) for score in scores]
@@ -17,8 +17,20 @@ Example usage:
                         help="Path to PDF file to analyze")
     parser.add_argument("--llm-url", default="http://127.0.0.1:5000/v1/chat/completions",
                         help="URL for LLM API")
-    parser.add_argument("--chunk-tokens", type=int, default=4000,
-                        help="Maximum tokens per chunk (default: 4000)")
+    parser.add_argument("--chunk-tokens", type=int, default=500,
+                        help="Maximum tokens per chunk (default: 500)")
+    parser.add_argument("--overlap-tokens", type=int, default=50,
+                        help="Tokens of each chunk repeated at the start of the next (default: 50)")
+    parser.add_argument("--tokenizer",
+                        help="Path to a tokenizer.json matching the model, for exact token counts")
+    parser.add_argument("--pdf-workers", type=int,
+                        help="Processes extracting PDF pages in parallel (default: number of CPUs)")
+    parser.add_argument("--no-ocr", action="store_true",
+                        help="Don't OCR pages that have no text layer")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Maximum chunks sent to the LLM concurrently (default: 4)")
+    parser.add_argument("--bypass-llm-cache", action="store_true",
+                        help="Ignore cached LLM responses (new responses are still cached)")
     
     args = parser.parse_args()
     
@@ -36,7 +48,13 @@ Example usage:
         # Process document
         analyzer = DocumentAnalyzer(
             llm_url=args.llm_url,
-            max_chunk_tokens=args.chunk_tokens
+            max_chunk_tokens=args.chunk_tokens,
+            overlap_tokens=args.overlap_tokens,
+            bypass_llm_cache=args.bypass_llm_cache,
+            tokenizer_path=args.tokenizer,
+            pdf_workers=args.pdf_workers,
+            chunk_workers=args.workers,
+            ocr=not args.no_ocr
         )
         
         print(f"Processing PDF: {pdf_path}")
@@ -0,0 +1,72 @@
+import logging
+import threading
+from time import sleep
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, Type
+
+import requests
+
+from pipeline import Pipeline, Stage
+
+
+class ChunkEngine:
+    """Run an LLM extraction function over text chunks concurrently.
+
+    Chunks are read lazily, so a streamed document keeps flowing in while
+    earlier chunks are being processed. Each chunk is retried on its own and
+    results come back in chunk order as (index, chunk, result, error) for the
+    caller to merge. `workers` is an upper bound: the LLM client's adaptive
+    limiter decides how many requests the endpoint actually gets at once.
+
+    Only `retry_on` errors (unparseable or invalid output by default) are
+    retried here. Transport errors are already retried by the LLM client, so
+    they and anything else are returned as the chunk's error straight away.
+    """
+
+    def __init__(self, workers: int = 4, retries: int = 2, backoff: float = 1.0,
+                 logger: Optional[logging.Logger] = None,
+                 retry_on: Tuple[Type[Exception], ...] = (ValueError,)):
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.retry_on = retry_on
+        self.backoff = backoff
+        self.logger = logger or logging.getLogger(__name__)
+        self.progress_lock = threading.Lock()
+
+    def _attempt(self, func: Callable[[Any], Any], chunk: Any) -> Tuple[Any, Optional[Exception]]:
+        """Call `func` on a chunk with retries, returning (result, error)"""
+        for attempt in range(self.retries + 1):
+            try:
+                return func(chunk), None
+            except requests.RequestException as e:
+                # Some requests errors are also ValueErrors, but never a bad completion
+                return None, e
+            except self.retry_on as e:
+                if attempt == self.retries:
+                    return None, e
+                self.logger.warning(f"Chunk failed ({str(e)}), retry {attempt + 1}/{self.retries}")
+                sleep(self.backoff * (attempt + 1))  # Linear backoff
+            except Exception as e:
+                return None, e
+
+    def run(self, chunks: Iterable[Any], func: Callable[[Any], Any],
+            on_complete: Optional[Callable[[Any], None]] = None) -> Iterator[Tuple[int, Any, Any, Optional[Exception]]]:
+        """Process chunks concurrently, yielding (index, chunk, result, error) in chunk order.
+
+        `on_complete` is called once per chunk as soon as it finishes, in
+        completion order, e.g. to advance a progress bar.
+        """
+        def process(chunk: Any) -> Tuple[Any, Optional[Exception]]:
+            outcome = self._attempt(func, chunk)
+            if on_complete:
+                with self.progress_lock:
+                    on_complete(chunk)
+            return outcome
+
+        pipeline = Pipeline(
+            [Stage("chunks", process, self.workers)],
+            queue_size=self.workers * 2, logger=self.logger
+        )
+        for index, chunk, outcome in pipeline.run(chunks):
+            # The stage only drops a chunk if the progress callback itself failed
+            result, error = outcome if outcome is not None else (None, RuntimeError("chunk processing failed"))
+            yield index, chunk, result, error
@@ -0,0 +1,162 @@
+import re
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Tuple
+
+from token_counter import TokenCounter
+
+# End of a sentence (punctuation plus closing quotes/brackets, then whitespace) or a paragraph break
+_SENTENCE_END = re.compile(r'[.!?]["\'\)\]]*\s+|\n\s*\n')
+# Last word before a period, including dotted abbreviations such as "e.g" or "U.S"
+_LAST_WORD = re.compile(r'((?:\w+\.)*\w+)$')
+
+# Words ending in a period that usually don't end a sentence, e.g. "Dr. Jane Doe"
+ABBREVIATIONS = {
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'gen', 'col', 'lt', 'sgt', 'capt', 'rev',
+    'hon', 'inc', 'co', 'corp', 'ltd', 'llc', 'dept', 'univ', 'no', 'vs', 'etc', 'e.g', 'i.e', 'u.s'
+}
+
+
+class StreamingChunker:
+    """Split a stream of texts into chunks of at most `max_tokens` tokens.
+
+    Works in a single pass: sentences are cut from the incoming text as it
+    arrives and packed by a local token estimate, scaled by the ratio of real
+    to estimated tokens seen so far. Each packed chunk is then counted once
+    with the real counter and trimmed if it is over. Chunks end on sentence
+    boundaries where possible, and each new chunk starts with up to
+    `overlap_tokens` of trailing sentences from the previous one so names on
+    a boundary appear whole in at least one chunk.
+    """
+
+    def __init__(self, token_counter: TokenCounter, max_tokens: int = 500, overlap_tokens: int = 0):
+        self.token_counter = token_counter
+        self.max_tokens = max(1, max_tokens)
+        self.overlap_tokens = min(max(0, overlap_tokens), self.max_tokens // 2)
+        # Local counter for splitting oversized sentences; the real one may be a server round trip
+        self.estimator = TokenCounter()
+        # Real tokens per estimated token, learned from every counted chunk
+        self.scale = 1.0
+
+    def _ends_sentence(self, text: str, start: int, match: re.Match) -> bool:
+        if match.group().startswith('\n'):
+            return True
+        if text[match.start()] != '.':
+            return True
+        word = _LAST_WORD.search(text, max(start, match.start() - 12), match.start())
+        if not word:
+            return True
+        # Single initials ("J. Smith") and known abbreviations don't end a sentence
+        return not (len(word.group(1)) == 1 and word.group(1).isupper()) and word.group(1).lower() not in ABBREVIATIONS
+
+    def sentences(self, texts: Iterable[str], separator: str = "\n") -> Iterator[str]:
+        """Yield whitespace-normalized sentences from a stream of texts.
+
+        `separator` goes between consecutive texts: a newline for separate
+        documents such as PDF pages, and nothing for blocks of one stream, which
+        may end in the middle of a word.
+        """
+        carry = ""
+        # Text without any sentence end is cut at a word boundary once it gets this long
+        max_carry = self.max_tokens * 16
+        for text in texts:
+            buffer = f"{carry}{separator}{text}" if carry else text
+            start = 0
+            for match in _SENTENCE_END.finditer(buffer):
+                if not self._ends_sentence(buffer, start, match):
+                    continue
+                sentence = ' '.join(buffer[start:match.end()].split())
+                if sentence:
+                    yield sentence
+                start = match.end()
+
+            while len(buffer) - start > max_carry:
+                end = start + max_carry
+                cut = max(buffer.rfind(' ', start, end), buffer.rfind('\n', start, end))
+                cut = cut if cut > start else end
+                sentence = ' '.join(buffer[start:cut].split())
+                if sentence:
+                    yield sentence
+                start = cut
+            carry = buffer[start:]
+
+        sentence = ' '.join(carry.split())
+        if sentence:
+            yield sentence
+
+    def _fits(self, estimated: int) -> bool:
+        return estimated * self.scale <= self.max_tokens
+
+    def _pieces(self, sentence: str) -> Iterator[Tuple[str, int]]:
+        """A sentence with its estimated token count, split further if it alone exceeds the limit"""
+        tokens = TokenCounter.estimate(sentence)
+        if self._fits(tokens):
+            yield sentence, tokens
+            return
+        for piece in self.estimator.split(sentence, max(1, int(self.max_tokens / self.scale))):
+            yield piece, TokenCounter.estimate(piece)
+
+    def _confirm(self, window: Deque[Tuple[str, int]], fresh: int) -> Tuple[str, List[Tuple[str, int]]]:
+        """Count the chunk in `window` for real, moving trailing pieces out until it fits.
+
+        Returns the chunk text and the pieces moved out, which start the next chunk.
+        """
+        spill: List[Tuple[str, int]] = []
+        while True:
+            text = ' '.join(piece for piece, _ in window)
+            tokens = self.token_counter.count(text)
+            if not spill:
+                estimated = sum(piece_tokens for _, piece_tokens in window)
+                if estimated:
+                    self.scale = (self.scale + tokens / estimated) / 2
+            if tokens <= self.max_tokens:
+                return text, spill
+
+            if fresh - len(spill) > 1:
+                spill.insert(0, window.pop())
+            elif len(window) > 1:
+                # Only one new piece is left; give up overlap before cutting it
+                window.popleft()
+            else:
+                piece, _ = window.pop()
+                head = self.token_counter.truncate(piece, self.max_tokens) or piece[:self.max_tokens]
+                rest = piece[len(head):].strip()
+                window.append((head, TokenCounter.estimate(head)))
+                if rest:
+                    spill.insert(0, (rest, TokenCounter.estimate(rest)))
+                return head, spill
+
+    def _advance(self, window: Deque[Tuple[str, int]], fresh: int, incoming: int) -> Tuple[str, int]:
+        """Emit the chunk in `window`, keeping its tail as overlap for the next one.
+
+        Returns the chunk and how many pieces of the window have not been emitted yet.
+        """
+        chunk, spill = self._confirm(window, fresh)
+        spill_tokens = sum(tokens for _, tokens in spill)
+        window_tokens = sum(tokens for _, tokens in window)
+        # Carry the tail of this chunk into the next one as overlap
+        while window and (window_tokens * self.scale > self.overlap_tokens
+                          or not self._fits(window_tokens + spill_tokens + incoming)):
+            window_tokens -= window.popleft()[1]
+        window.extend(spill)
+        return chunk, len(spill)
+
+    def chunks(self, texts: Iterable[str], separator: str = "\n") -> Iterator[str]:
+        """Yield token-bounded chunks from a stream of texts joined by `separator`"""
+        window: Deque[Tuple[str, int]] = deque()
+        window_tokens = 0
+        # Pieces at the end of the window that no chunk has included yet
+        fresh = 0
+
+        for sentence in self.sentences(texts, separator):
+            for piece, tokens in self._pieces(sentence):
+                while fresh and not self._fits(window_tokens + tokens):
+                    chunk, fresh = self._advance(window, fresh, tokens)
+                    window_tokens = sum(piece_tokens for _, piece_tokens in window)
+                    yield chunk
+                window.append((piece, tokens))
+                window_tokens += tokens
+                fresh += 1
+
+        while fresh:
+            chunk, fresh = self._advance(window, fresh, 0)
+            yield chunk
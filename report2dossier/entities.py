@@ -0,0 +1,103 @@
+import re
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List
+
+# Dates and PDF artifacts that the LLM sometimes returns as entities
+_INVALID_ENTITY = re.compile('|'.join([
+    r'file d',  # Matches "file d" prefix
+    r'\b[A-Z][a-z]{2,8}\s+\d{1,2},?\s+\d{4}\b',  # Month DD, YYYY
+    r'\b\d{1,2}\s+[A-Z][a-z]{2,8}\s+\d{4}\b',  # DD Month YYYY
+    r'N o v emb er',  # Split November
+    r'Ma y',  # Split May
+    r'file d.*\d{4}',  # Any "filed" followed by a year
+    r'\b[A-Z][a-z]{2,8}\s+\d{1,2}\b'  # Month DD
+]), re.IGNORECASE)
+_WEIRD_SPACING = re.compile(r'\w\s\w\s\w')
+
+# One pass over a chunk: rejoin words hyphenated across lines, and collapse whitespace
+# together with any characters other than basic punctuation into a single space
+_CLEANUP = re.compile(r'(?<=\w)(-\s+)(?=\w)|[^\w.,;:?!-]+')
+
+_KEY_TOKENS = re.compile(r'\w+')
+_EDGE_PUNCTUATION = '"\'`.,;:-()[]{} '
+
+# Legal-form words that don't distinguish one organization from another
+ORG_SUFFIXES = {
+    'the', 'inc', 'incorporated', 'corp', 'corporation', 'co', 'company', 'ltd', 'limited',
+    'llc', 'llp', 'plc', 'gmbh', 'ag', 'sa', 'bv', 'nv', 'group', 'holdings'
+}
+
+
+def clean_text(text: str) -> str:
+    """Clean a text chunk in a single regex pass before entity extraction"""
+    return _CLEANUP.sub(lambda match: '' if match.group(1) else ' ', text).strip()
+
+
+def filter_invalid_entities(entities: Iterable[str]) -> List[str]:
+    """Filter out invalid entities like dates and artifacts"""
+    filtered = []
+    for entity in entities:
+        # Skip dates, very short entities, entities with many digits and split-up words
+        if (_INVALID_ENTITY.search(entity) or len(entity) < 4
+                or sum(c.isdigit() for c in entity) > 2 or _WEIRD_SPACING.search(entity)):
+            continue
+        filtered.append(entity)
+    return filtered
+
+
+def normalize_entity(name: str) -> str:
+    """Collapse whitespace and strip stray quotes and punctuation around a name"""
+    return ' '.join(name.split()).strip(_EDGE_PUNCTUATION)
+
+
+def entity_key(name: str, organization: bool = False) -> str:
+    """Comparison key: lowercase tokens in sorted order, without legal-form words for organizations"""
+    tokens = _KEY_TOKENS.findall(name.lower())
+    if organization:
+        tokens = [token for token in tokens if token not in ORG_SUFFIXES] or tokens
+    return ' '.join(sorted(tokens))
+
+
+def dedupe_entities(names: Iterable[str], organization: bool = False, threshold: float = 0.92) -> List[str]:
+    """Merge spelling and formatting variants of the same entity, keeping the most complete form.
+
+    Names with the same key (e.g. "ACME Corp" and "ACME Corporation") merge
+    directly. Remaining keys are only compared fuzzily within blocks that
+    share a key prefix, so large entity lists avoid an all-pairs comparison.
+    """
+    variants: Dict[str, List[str]] = {}
+    for name in names:
+        name = normalize_entity(name)
+        if name:
+            variants.setdefault(entity_key(name, organization), []).append(name)
+
+    blocks: Dict[str, List[str]] = {}
+    for key in variants:
+        blocks.setdefault(key[:4], []).append(key)
+
+    # Union keys within each block whose similarity clears the threshold
+    canonical_key: Dict[str, str] = {}
+    for keys in blocks.values():
+        # SequenceMatcher caches its analysis of the second sequence, so keep one per representative
+        representatives: List[SequenceMatcher] = []
+        for key in sorted(keys, key=len, reverse=True):
+            for matcher in representatives:
+                matcher.set_seq1(key)
+                if matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold \
+                        and matcher.ratio() >= threshold:
+                    canonical_key[key] = matcher.b
+                    break
+            else:
+                representatives.append(SequenceMatcher(None, key, key, autojunk=False))
+                canonical_key[key] = key
+
+    merged: Dict[str, List[str]] = {}
+    for key, names_for_key in variants.items():
+        merged.setdefault(canonical_key[key], []).extend(names_for_key)
+
+    # The longest variant is usually the complete name ("ACME Corporation" over "ACME Corp");
+    # among equally long ones prefer the properly capitalized spelling
+    return sorted(
+        max(group, key=lambda name: (len(name), sum(c.isupper() for c in name), name))
+        for group in merged.values()
+    )
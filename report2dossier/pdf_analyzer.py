@@ -1,117 +1,168 @@
 import PyPDF2
-import requests
+import io
+import os
 from pathlib import Path
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple, Union
 import json
-import re
-import time
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Shared modules (llm_client, llm_cache, token_counter, ...) live in the repository root
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from llm_json import json_response_format, parse_json_object, string_list_schema, string_lists
+from token_counter import TokenCounter
+from report2dossier.chunk_engine import ChunkEngine
+from report2dossier.chunker import StreamingChunker
+from report2dossier.entities import clean_text, dedupe_entities, filter_invalid_entities
+from report2dossier.pdfocr import OCRExtractor
+
+ENTITY_KEYS = ("people", "organizations")
+
+def _extract_page_range(pdf_path: str, start: int, end: int, ocr: Optional[OCRExtractor] = None) -> List[str]:
+    """Text of pages [start, end) of a PDF, OCRing pages without a text layer; runs in a worker process"""
+    texts = []
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for number in range(start, end):
+            page = reader.pages[number]
+            text = page.extract_text()
+            if ocr and ocr.needs_ocr(text):
+                try:
+                    text = ocr.ocr_page(pdf_path, page, number)
+                except Exception as e:
+                    logging.getLogger(__name__).warning(
+                        f"OCR failed for page {number + 1}, keeping the text layer: {str(e)}"
+                    )
+            texts.append(text)
+    return texts
+
 
 class DocumentAnalyzer:
     def __init__(self, llm_url="http://127.0.0.1:5000/v1/chat/completions",
-                 max_chunk_tokens: int = 2000):
+                 max_chunk_tokens: int = 500,
+                 llm_cache_path: Optional[str] = "results/llm_cache.sqlite3",
+                 bypass_llm_cache: bool = False,
+                 timeout: int = 30,
+                 tokenizer_path: Optional[str] = None,
+                 pdf_workers: Optional[int] = None,
+                 pages_per_task: int = 8,
+                 chunk_workers: int = 4,
+                 ocr: bool = True,
+                 overlap_tokens: int = 50):
         self.llm_url = llm_url
         self.max_chunk_tokens = max_chunk_tokens
+        self.pdf_workers = pdf_workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
+        self.token_counter = TokenCounter(llm_url, tokenizer_path)
+        self.chunker = StreamingChunker(self.token_counter, max_chunk_tokens, overlap_tokens)
+        self.llm_client = LLMClient(
+            llm_url,
+            timeout=timeout,
+            pool_size=chunk_workers,
+            cache=LLMCache(llm_cache_path, bypass=bypass_llm_cache) if llm_cache_path else None
+        )
         
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(message)s'
         )
         self.logger = logging.getLogger(__name__)
+        self.chunk_engine = ChunkEngine(workers=chunk_workers, logger=self.logger)
+        # Scanned pages without a text layer fall back to OCR when tesseract is installed
+        self.ocr = OCRExtractor(workers=self.pdf_workers) if ocr and OCRExtractor.available() else None
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text content from PDF file"""
+    def extract_text_from_bytes(self, data: bytes) -> str:
+        """Extract text content from an in-memory PDF, e.g. a downloaded document"""
+        try:
+            reader = PyPDF2.PdfReader(io.BytesIO(data))
+            return '\n'.join(page.extract_text() for page in reader.pages)
+        except Exception as e:
+            self.logger.error(f"Failed to read PDF: {str(e)}")
+            raise
+
+    def iter_pdf_pages(self, pdf_path: str) -> Iterator[str]:
+        """Yield the text of each PDF page in order while later pages are still being parsed.
+
+        Page ranges are extracted in a process pool; only a few ranges are in
+        flight at once, so memory stays bounded for very large documents.
+        Scanned pages are OCRed by the same workers.
+        """
         try:
             with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = []
-                for page in reader.pages:
-                    text.append(page.extract_text())
-                return '\n'.join(text)
+                page_count = len(PyPDF2.PdfReader(file).pages)
+            
+            ranges = [
+                (start, min(start + self.pages_per_task, page_count))
+                for start in range(0, page_count, self.pages_per_task)
+            ]
+            if self.pdf_workers <= 1 or len(ranges) <= 1:
+                for start, end in ranges:
+                    yield from _extract_page_range(pdf_path, start, end, self.ocr)
+                return
+            
+            with ProcessPoolExecutor(max_workers=self.pdf_workers) as pool:
+                pending = deque()
+                remaining = iter(ranges)
+                for start, end in islice(remaining, self.pdf_workers * 2):
+                    pending.append((start, pool.submit(_extract_page_range, pdf_path, start, end, self.ocr)))
+                while pending:
+                    _, future = pending.popleft()
+                    pages = future.result()
+                    # Keep the pool busy while the caller works on these pages
+                    for next_start, next_end in islice(remaining, 1):
+                        pending.append((next_start, pool.submit(
+                            _extract_page_range, pdf_path, next_start, next_end, self.ocr
+                        )))
+                    yield from pages
         except Exception as e:
             self.logger.error(f"Failed to read PDF: {str(e)}")
             raise
 
+    def extract_text_from_pdf(self, pdf_path: str) -> str:
+        """Extract text content from PDF file"""
+        return '\n'.join(self.iter_pdf_pages(pdf_path))
+
     def clean_text_chunk(self, text: str) -> str:
         """Clean text chunk before processing"""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        # Fix common PDF artifacts
-        text = re.sub(r'(?<=\w)-\s+(?=\w)', '', text)  # Fix hyphenated words
-        text = re.sub(r'(?<=\w)\s+(?=\w)', ' ', text)  # Fix split words
-        # Remove special characters but keep basic punctuation
-        text = re.sub(r'[^\w\s.,;:?!-]', ' ', text)
-        return text.strip()
+        return clean_text(text)
 
     def filter_invalid_entities(self, entities: List[str]) -> List[str]:
         """Filter out invalid entities like dates and artifacts"""
-        filtered = []
-        
-        # Patterns to exclude
-        date_patterns = [
-            r'file d',  # Matches "file d" prefix
-            r'\b[A-Z][a-z]{2,8}\s+\d{1,2},?\s+\d{4}\b',  # Month DD, YYYY
-            r'\b\d{1,2}\s+[A-Z][a-z]{2,8}\s+\d{4}\b',  # DD Month YYYY
-            r'N o v emb er',  # Split November
-            r'Ma y',  # Split May
-            r'file d.*\d{4}',  # Any "filed" followed by a year
-            r'\b[A-Z][a-z]{2,8}\s+\d{1,2}\b'  # Month DD
-        ]
-        
-        # Combine all patterns
-        combined_pattern = '|'.join(date_patterns)
+        return filter_invalid_entities(entities)
+
+    def parse_entities_response(self, content: str) -> Dict:
+        """Recover the entity lists from an LLM entity extraction response"""
+        return string_lists(parse_json_object(content), ENTITY_KEYS)
+
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[str]:
+        """Split streamed page texts into sentence-aligned chunks of at most max_chunk_tokens"""
+        return self.chunker.chunks(pages)
+
+    def extract_chunk_entities(self, chunk: str) -> Dict:
+        """Extract people and organizations from one chunk of text"""
+        # Clean the chunk
+        clean_chunk = self.clean_text_chunk(chunk)
         
-        for entity in entities:
-            # Skip if entity matches any date pattern
-            if re.search(combined_pattern, entity, re.IGNORECASE):
-                continue
-                
-            # Skip if entity is too short
-            if len(entity) < 4:
-                continue
-                
-            # Skip if entity has too many numbers
-            if sum(c.isdigit() for c in entity) > 2:
-                continue
-                
-            # Skip if entity has weird spacing
-            if re.search(r'\w\s\w\s\w', entity):
-                continue
-                
-            filtered.append(entity)
+        # Skip empty or very short chunks
+        if len(clean_chunk.strip()) < 100:
+            return {}
         
-        return filtered
-
-    def extract_entities(self, text: str) -> Tuple[List[str], List[str]]:
-            """Extract people and organizations using LLM"""
-            try:
-                # Reduce chunk size and increase timeout
-                chunk_size = 2000  # Reduced from 6000
-                chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-                
-                all_people = set()
-                all_organizations = set()
-                
-                for i, chunk in enumerate(chunks, 1):
-                    self.logger.info(f"Processing chunk {i} of {len(chunks)}")
-                    
-                    # Clean the chunk
-                    clean_chunk = self.clean_text_chunk(chunk)
-                    
-                    # Skip empty or very short chunks
-                    if len(clean_chunk.strip()) < 100:
-                        continue
-                    
-                    data = {
-                        "model": "gpt-3.5-turbo",
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "Extract names of people and organizations from text. Respond only with JSON."
-                            },
-                            {
-                                "role": "user",
-                                "content": f"""Extract named entities from this text. Return only a JSON object with two arrays.
+        messages = [
+            {
+                "role": "system",
+                "content": "Extract names of people and organizations from text. Respond only with JSON."
+            },
+            {
+                "role": "user",
+                "content": f"""Extract named entities from this text. Return only a JSON object with two arrays.
 
     Format: {{"people": ["Name 1", "Name 2"], "organizations": ["Org 1", "Org 2"]}}
 
@@ -123,60 +174,51 @@ class DocumentAnalyzer:
 
     Text:
     {clean_chunk}"""
-                            }
-                        ],
-                        "max_tokens": 1000,  # Reduced from 4000
-                        "temperature": 0.3
-                    }
-
-                    retries = 3
-                    for attempt in range(retries):
-                        try:
-                            response = requests.post(
-                                self.llm_url,
-                                json=data,
-                                headers={"Content-Type": "application/json"},
-                                timeout=30  # Reduced timeout, but will retry
-                            )
-                            response.raise_for_status()
-                            
-                            content = response.json()["choices"][0]["message"]["content"]
-                            # Clean the content string
-                            content = content.strip()
-                            if not content.startswith('{'):
-                                content = content[content.find('{'):]
-                            if not content.endswith('}'):
-                                content = content[:content.rfind('}')+1]
-                                
-                            entities = json.loads(content)
-                            
-                            # Update sets with new entities
-                            if "people" in entities:
-                                all_people.update(entities["people"])
-                            if "organizations" in entities:
-                                all_organizations.update(entities["organizations"])
-                                
-                            # If successful, break retry loop
-                            break
-                            
-                        except requests.Timeout:
-                            self.logger.warning(f"Timeout on chunk {i}, attempt {attempt + 1}/{retries}")
-                            if attempt == retries - 1:  # Last attempt
-                                self.logger.error(f"Failed to process chunk {i} after {retries} attempts")
-                        except json.JSONDecodeError as e:
-                            self.logger.warning(f"Failed to parse JSON from chunk {i}: {str(e)}")
-                            break  # Don't retry JSON parsing errors
-                        except Exception as e:
-                            self.logger.warning(f"Error processing chunk {i}: {str(e)}")
-                            if attempt == retries - 1:  # Last attempt
-                                self.logger.error(f"Failed to process chunk {i} after {retries} attempts")
+            }
+        ]
+
+        # Transport retries and backoff are handled by the LLM client
+        content = self.llm_client.chat(
+            messages,
+            max_tokens=1000,  # Reduced from 4000
+            temperature=0.3,
+            validate=self.parse_entities_response,
+            # Servers that support it constrain decoding to the schema, so the JSON is always well-formed
+            response_format=json_response_format(string_list_schema(*ENTITY_KEYS), "entities")
+        )
+        return self.parse_entities_response(content)
+
+    def extract_entities(self, text: Union[str, Iterable[str]]) -> Tuple[List[str], List[str]]:
+            """Extract people and organizations using LLM from a text or a stream of page texts"""
+            try:
+                # Keep chunks small so each request finishes well within the timeout
+                chunks = self.iter_chunks([text] if isinstance(text, str) else text)
+                
+                all_people = set()
+                all_organizations = set()
+                
+                # Chunks are analyzed concurrently and merged back in document order
+                for index, _, entities, error in self.chunk_engine.run(chunks, self.extract_chunk_entities):
+                    i = index + 1
+                    if isinstance(error, json.JSONDecodeError):
+                        self.logger.warning(f"Failed to parse JSON from chunk {i}: {str(error)}")
+                        continue
+                    if error:
+                        self.logger.error(f"Failed to process chunk {i}: {str(error)}")
+                        continue
+                    self.logger.info(f"Processed chunk {i}")
                     
-                    # Add a small delay between chunks
-                    time.sleep(1)
+                    # Update sets with new entities
+                    if "people" in entities:
+                        all_people.update(entities["people"])
+                    if "organizations" in entities:
+                        all_organizations.update(entities["organizations"])
                 
-                # Remove empty strings and duplicates, then filter invalid entities
-                people = self.filter_invalid_entities(sorted(list(filter(None, all_people))))
-                organizations = self.filter_invalid_entities(sorted(list(filter(None, all_organizations))))
+                # Filter invalid entities, then merge variants of the same name
+                people = dedupe_entities(self.filter_invalid_entities(filter(None, all_people)))
+                organizations = dedupe_entities(
+                    self.filter_invalid_entities(filter(None, all_organizations)), organization=True
+                )
                 
                 self.logger.info(f"Extracted {len(people)} people and {len(organizations)} organizations")
                 return people, organizations
@@ -212,12 +254,14 @@ class DocumentAnalyzer:
             pdf_path = Path(pdf_path)
             self.logger.info(f"Processing document: {pdf_path}")
             
-            # Extract text from PDF
-            text = self.extract_text_from_pdf(str(pdf_path))
-            
-            # Extract entities
-            people, organizations = self.extract_entities(text)
+            # Extract entities while later pages are still being parsed
+            people, organizations = self.extract_entities(self.iter_pdf_pages(str(pdf_path)))
             self.logger.info(f"Found {len(people)} people and {len(organizations)} organizations")
+            llm_stats = self.llm_client.limiter.stats()
+            self.logger.info(
+                f"LLM concurrency limit {llm_stats['limit']}, "
+                f"latency p50 {llm_stats['latency_p50']}s / p90 {llm_stats['latency_p90']}s"
+            )
             
             # Create results directory if it doesn't exist
             output_dir = Path("results")
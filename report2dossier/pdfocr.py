@@ -1,13 +1,196 @@
-from pdf2image import convert_from_path
-import pytesseract
+import argparse
+import hashlib
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 
-# Convert PDF pages to images
-pdf_file = "report.pdf"
-images = convert_from_path(pdf_file)
+import PyPDF2
 
-# Extract text from images
-text = ""
-for image in images:
-    text += pytesseract.image_to_string(image)
+try:
+    from pdf2image import convert_from_path
+    import pytesseract
+except ImportError:  # Optional: OCR needs pdf2image (poppler) and pytesseract (tesseract)
+    convert_from_path = None
+    pytesseract = None
 
-print(text)
+
+def _ocr_page(pdf_path: str, page_number: int, dpi: int, lang: str) -> str:
+    """Render a single page and OCR it; runs in a worker process.
+
+    Rendering one page at a time keeps at most one page image per worker in memory.
+    """
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number + 1, last_page=page_number + 1)
+    return "".join(pytesseract.image_to_string(image, lang=lang) for image in images)
+
+
+def page_fingerprint(page) -> str:
+    """Hash of a page's content stream and embedded images, stable across files.
+
+    Raises if an image can't be read: hashing it as empty would give every
+    scan the same fingerprint and serve them all one page's cached text.
+    """
+    digest = hashlib.sha256()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    if xobjects:
+        for name in sorted(xobjects.get_object()):
+            digest.update(name.encode('utf-8'))
+            digest.update(xobjects.get_object()[name].get_object().get_data())
+    return digest.hexdigest()
+
+
+class OCRExtractor:
+    """OCR fallback for PDF pages without a text layer.
+
+    Pages are rendered one at a time and OCRed with tesseract across a process
+    pool. Results are cached on disk by page content hash, so the same scan
+    is never OCRed twice, even inside a different file.
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 dpi: int = 300,
+                 lang: str = "eng",
+                 cache_dir: Optional[str] = "results/ocr_cache",
+                 min_text_chars: int = 20):
+        self.workers = workers or os.cpu_count() or 1
+        self.dpi = dpi
+        self.lang = lang
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.min_text_chars = min_text_chars
+        self.logger = logging.getLogger(__name__)
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def available() -> bool:
+        """Whether the OCR dependencies and the tesseract binary are installed"""
+        if pytesseract is None or convert_from_path is None:
+            return False
+        try:
+            pytesseract.get_tesseract_version()
+            return True
+        except Exception:
+            return False
+
+    def needs_ocr(self, text: Optional[str]) -> bool:
+        """Whether extracted page text is too sparse to be a real text layer"""
+        return len((text or "").strip()) < self.min_text_chars
+
+    def _cache_path(self, fingerprint: str) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        key = hashlib.sha256(f"{fingerprint}:{self.dpi}:{self.lang}".encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.txt"
+
+    def _cache_get(self, fingerprint: str) -> Optional[str]:
+        path = self._cache_path(fingerprint)
+        if path and path.exists():
+            return path.read_text(encoding='utf-8')
+        return None
+
+    def _cache_put(self, fingerprint: str, text: str) -> None:
+        path = self._cache_path(fingerprint)
+        if path:
+            # Page workers in other processes may be writing the same identical page
+            tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(text, encoding='utf-8')
+            os.replace(tmp_path, path)
+
+    def ocr_pages(self, pdf_path: str, page_numbers: Iterable[int]) -> Iterator[Tuple[int, str]]:
+        """OCR the given (zero-based) pages, yielding (page_number, text) in order"""
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            fingerprints = {number: page_fingerprint(reader.pages[number]) for number in page_numbers}
+
+        numbers = sorted(fingerprints)
+        cached: Dict[int, str] = {}
+        for number in numbers:
+            text = self._cache_get(fingerprints[number])
+            if text is not None:
+                cached[number] = text
+        missing = [number for number in numbers if number not in cached]
+        if not missing:
+            for number in numbers:
+                yield number, cached[number]
+            return
+        self.logger.info(f"OCR of {len(missing)} pages ({len(cached)} cached) in {pdf_path}")
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, max(1, len(missing)))) as pool:
+            # Bound the number of rendered pages in flight
+            submissions = iter(missing)
+            pending = deque(
+                (number, pool.submit(_ocr_page, pdf_path, number, self.dpi, self.lang))
+                for number in islice(submissions, self.workers * 2)
+            )
+            for number in numbers:
+                if number in cached:
+                    yield number, cached[number]
+                    continue
+                expected, future = pending.popleft()
+                for extra in islice(submissions, 1):
+                    pending.append((extra, pool.submit(_ocr_page, pdf_path, extra, self.dpi, self.lang)))
+                text = future.result()
+                self._cache_put(fingerprints[expected], text)
+                yield expected, text
+
+    def ocr_page(self, pdf_path: str, page, page_number: int) -> str:
+        """OCR one (zero-based) page in the current process, going through the cache.
+
+        Used from the PDF analyzer's page workers, so scanned pages share their
+        process pool instead of starting one of their own.
+        """
+        try:
+            fingerprint = page_fingerprint(page)
+        except Exception as e:
+            self.logger.warning(f"Can't fingerprint page {page_number + 1}, OCR result won't be cached: {str(e)}")
+            return _ocr_page(pdf_path, page_number, self.dpi, self.lang)
+
+        text = self._cache_get(fingerprint)
+        if text is None:
+            text = _ocr_page(pdf_path, page_number, self.dpi, self.lang)
+            self._cache_put(fingerprint, text)
+        return text
+
+    def extract_text(self, pdf_path: str, all_pages: bool = False) -> str:
+        """Text of a whole PDF, OCRing only pages without a text layer unless `all_pages`"""
+        with open(pdf_path, 'rb') as file:
+            texts = [page.extract_text() for page in PyPDF2.PdfReader(file).pages]
+        if all_pages:
+            ocr_numbers = range(len(texts))
+        else:
+            ocr_numbers = [number for number, text in enumerate(texts) if self.needs_ocr(text)]
+        for number, text in self.ocr_pages(pdf_path, ocr_numbers):
+            texts[number] = text
+        return "\n".join(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="PDF OCR - Extract text from a PDF, OCRing pages without a text layer"
+    )
+    parser.add_argument("pdf", nargs="?", default="report.pdf", help="Path to the PDF (default: report.pdf)")
+    parser.add_argument("--all-pages", action="store_true",
+                        help="OCR every page, even those with a text layer")
+    parser.add_argument("--workers", type=int, help="Parallel OCR processes (default: number of CPUs)")
+    parser.add_argument("--dpi", type=int, default=300, help="Rendering resolution (default: 300)")
+    parser.add_argument("--lang", default="eng", help="Tesseract language (default: eng)")
+    args = parser.parse_args()
+
+    if not OCRExtractor.available():
+        print("Error: OCR requires pdf2image, pytesseract and the tesseract binary")
+        return
+
+    extractor = OCRExtractor(workers=args.workers, dpi=args.dpi, lang=args.lang)
+    print(extractor.extract_text(args.pdf, all_pages=args.all_pages))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,77 @@
 import sys
+import codecs
 import json
-import requests
+import argparse
 from pathlib import Path
 from tqdm import tqdm
 import time
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Tuple
+
+# Shared modules (llm_client, llm_cache, ...) live in the repository root
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from llm_json import json_response_format, parse_json_object, string_list_schema, string_lists
+from token_counter import TokenCounter
+from report2dossier.chunk_engine import ChunkEngine
+from report2dossier.chunker import StreamingChunker
+from report2dossier.entities import dedupe_entities
+
+ENTITY_KEYS = ("persons", "organizations")
 
 class EntityExtractor:
-    def __init__(self, chunk_size: int = 2000):
-        self.chunk_size = chunk_size
-        self.url = "http://127.0.0.1:5000/v1/chat/completions"
-        self.headers = {"Content-Type": "application/json"}
+    def __init__(self, chunk_tokens: int = 500,
+                 overlap_tokens: int = 50,
+                 llm_cache_path: Optional[str] = "results/llm_cache.sqlite3",
+                 bypass_llm_cache: bool = False,
+                 url: str = "http://127.0.0.1:5000/v1/chat/completions",
+                 timeout: int = 120,
+                 workers: int = 4):
+        self.chunk_tokens = chunk_tokens
+        self.url = url
+        self.chunker = StreamingChunker(TokenCounter(url), chunk_tokens, overlap_tokens)
+        self.llm_client = LLMClient(
+            url,
+            model="local-model",
+            timeout=timeout,
+            pool_size=workers,
+            cache=LLMCache(llm_cache_path, bypass=bypass_llm_cache) if llm_cache_path else None
+        )
+        # Retries are per chunk in the engine, so one bad chunk doesn't hold up the others
+        self.chunk_engine = ChunkEngine(workers=workers, retries=2)
         self.system_prompt = """You are a named entity recognition system. Extract all person names and organization names from the input text.
         Return only a JSON object with two lists: 'persons' and 'organizations'. Each list should contain unique entries."""
 
     def chunk_text(self, text: str) -> List[str]:
-        """Split text into chunks while trying to preserve sentence boundaries"""
-        words = text.split()
-        chunks = []
-        current_chunk = []
-        current_length = 0
-        
-        for word in words:
-            current_length += len(word) + 1  # +1 for space
-            if current_length > self.chunk_size and current_chunk:
-                # Try to find a sentence boundary (. ! ?) in the last 100 characters
-                chunk_text = " ".join(current_chunk)
-                for sep in [". ", "! ", "? "]:
-                    last_sep = chunk_text.rfind(sep, -100)
-                    if last_sep != -1:
-                        chunks.append(chunk_text[:last_sep + 1])
-                        current_chunk = chunk_text[last_sep + 1:].split()
-                        break
-                else:
-                    chunks.append(chunk_text)
-                    current_chunk = []
-                current_length = sum(len(word) + 1 for word in current_chunk)
-            current_chunk.append(word)
-        
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
-        return chunks
+        """Split text into token-bounded chunks while trying to preserve sentence boundaries"""
+        return list(self.chunker.chunks([text]))
 
     def extract_entities_from_chunk(self, text: str, retry_count: int = 3) -> Dict[str, List[str]]:
         """Extract entities from a single chunk with retry logic"""
-        data = {
-            "model": "local-model",
-            "messages": [
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": text}
-            ],
-            "temperature": 0.0
-        }
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": text}
+        ]
 
+        # Transport errors are retried inside the LLM client; here we only re-ask on unrecoverable JSON
         for attempt in range(retry_count):
             try:
-                response = requests.post(self.url, headers=self.headers, json=data)
-                response.raise_for_status()
-                result = response.json()
-                content = result['choices'][0]['message']['content']
-                return json.loads(content)
-            except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+                content = self.llm_client.chat(
+                    messages, temperature=0.0, validate=self.parse_entities,
+                    response_format=json_response_format(string_list_schema(*ENTITY_KEYS), "entities")
+                )
+                return self.parse_entities(content)
+            except json.JSONDecodeError:
                 if attempt == retry_count - 1:
                     raise
-                time.sleep(1 * (attempt + 1))  # Exponential backoff
+                time.sleep(1 * (attempt + 1))  # Linear backoff
+
+    def parse_entities(self, content: str) -> Dict[str, List[str]]:
+        """Entity lists from a response, repairing noisy or truncated JSON"""
+        return string_lists(parse_json_object(content), ENTITY_KEYS)
 
     def merge_entities(self, entities_list: List[Dict[str, List[str]]]) -> Dict[str, List[str]]:
         """Merge entities from multiple chunks, removing duplicates"""
@@ -74,50 +82,94 @@ class EntityExtractor:
             all_persons.update(entities.get('persons', []))
             all_organizations.update(entities.get('organizations', []))
         
+        # Merge variants such as "ACME Corp" and "ACME Corporation"
         return {
-            'persons': sorted(list(all_persons)),
-            'organizations': sorted(list(all_organizations))
+            'persons': dedupe_entities(filter(None, all_persons)),
+            'organizations': dedupe_entities(filter(None, all_organizations), organization=True)
         }
 
+    def iter_file_chunks(self, input_file: Path, block_size: int = 1024 * 1024) -> Iterator[Tuple[str, int]]:
+        """Yield (chunk, bytes read so far) from a text file without loading it into memory.
+
+        The file is read in fixed-size blocks through an incremental UTF-8
+        decoder, so a character split across two blocks is decoded correctly
+        and undecodable bytes are replaced rather than aborting a long run.
+        """
+        position = 0
+        
+        def blocks() -> Iterator[str]:
+            nonlocal position
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            with open(input_file, 'rb') as f:
+                while True:
+                    data = f.read(block_size)
+                    position += len(data)
+                    text = decoder.decode(data, final=not data)
+                    if text:
+                        yield text
+                    if not data:
+                        break
+        
+        # Blocks are cut at arbitrary byte offsets, so they are joined without a separator
+        for chunk in self.chunker.chunks(blocks(), separator=""):
+            yield chunk, position
+
     def process_file(self, input_file: Path) -> Dict[str, List[str]]:
         """Process the entire file with progress monitoring"""
-        print(f"Reading file: {input_file}")
-        with open(input_file, 'r', encoding='utf-8') as f:
-            text = f.read()
-
-        chunks = self.chunk_text(text)
-        total_chars = len(text)
-        processed_chars = 0
-        all_entities = []
+        file_size = Path(input_file).stat().st_size
+        print(f"Reading file: {input_file} ({file_size:,} bytes)")
+        all_persons = set()
+        all_organizations = set()
+        processed_bytes = 0
 
-        print(f"\nProcessing text ({total_chars:,} characters in {len(chunks)} chunks)")
-        progress_bar = tqdm(total=total_chars, unit='chars', unit_scale=True)
+        progress_bar = tqdm(total=file_size, unit='B', unit_scale=True)
 
-        for chunk in chunks:
-            try:
-                chunk_entities = self.extract_entities_from_chunk(chunk)
-                all_entities.append(chunk_entities)
-                processed_chars += len(chunk)
-                progress_bar.update(len(chunk))
-            except Exception as e:
+        # The file streams through the chunker into concurrent workers; memory stays flat with file size
+        results = self.chunk_engine.run(
+            self.iter_file_chunks(input_file),
+            lambda item: self.extract_entities_from_chunk(item[0], retry_count=1)
+        )
+        for _, (_, position), chunk_entities, error in results:
+            if error:
                 progress_bar.close()
-                print(f"\nError processing chunk: {str(e)}")
-                raise
+                print(f"\nError processing chunk: {str(error)}")
+                raise error
+            all_persons.update(chunk_entities.get('persons', []))
+            all_organizations.update(chunk_entities.get('organizations', []))
+            # Results arrive in file order, so the bar shows bytes fully processed
+            progress_bar.update(position - processed_bytes)
+            processed_bytes = position
 
+        progress_bar.update(file_size - processed_bytes)
         progress_bar.close()
-        return self.merge_entities(all_entities)
+        return self.merge_entities([{'persons': all_persons, 'organizations': all_organizations}])
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python script.py input.txt")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Text Entity Extractor - Extract people and organizations from a text file"
+    )
+    parser.add_argument("input", help="Path to text file to analyze")
+    parser.add_argument("--chunk-tokens", type=int, default=500,
+                        help="Maximum tokens per chunk (default: 500)")
+    parser.add_argument("--overlap-tokens", type=int, default=50,
+                        help="Tokens of each chunk repeated at the start of the next (default: 50)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Maximum chunks sent to the LLM concurrently (default: 4)")
+    parser.add_argument("--bypass-llm-cache", action="store_true",
+                        help="Ignore cached LLM responses (new responses are still cached)")
+    args = parser.parse_args()
 
-    input_file = Path(sys.argv[1])
+    input_file = Path(args.input)
     if not input_file.exists():
         print(f"Error: File {input_file} not found")
         sys.exit(1)
 
-    extractor = EntityExtractor()
+    extractor = EntityExtractor(
+        chunk_tokens=args.chunk_tokens,
+        overlap_tokens=args.overlap_tokens,
+        bypass_llm_cache=args.bypass_llm_cache,
+        workers=args.workers
+    )
     
     try:
         print("Starting entity extraction...")
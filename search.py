@@ -2,28 +2,125 @@
 from duckduckgo_search import DDGS
 import re
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 import logging
-from typing import List, Optional, Dict
-from bs4 import BeautifulSoup
+from typing import List, Optional, Dict, Tuple, Iterable, Iterator, Set
 from urllib.parse import urlparse
 from time import sleep
 import json
+from fetcher import HostRateLimiter
+from pipeline import Pipeline, Stage
+from page_cache import PageCache
+from search_cache import SearchCache
+from llm_cache import LLMCache
+from llm_client import LLMClient, ThinkStripper
+from token_counter import TokenCounter
+from distilled_store import DistilledStore, load_distilled
+from url_utils import canonicalize_url
+from extractors import detect_encoding, get_extractor
+from near_dup import NearDuplicateIndex, simhash
+from ranking import bm25_scores, relative_scores
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor
+
+# Content types the extract stage knows how to turn into text
+HTML_TYPES = {'text/html', 'application/xhtml+xml'}
+TEXT_TYPES = {'text/plain'}
+PDF_TYPES = {'application/pdf', 'application/x-pdf'}
+SUPPORTED_TYPES = HTML_TYPES | TEXT_TYPES | PDF_TYPES
+
+
+# Section header separating pages in batched analysis prompts and replies
+BATCH_SECTION = re.compile(r'^[ \t#*]*=+[ \t]*PAGE[ \t]+(\d+)[ \t]*=+[ \t*]*$', re.MULTILINE | re.IGNORECASE)
+
+
+class PageRejected(Exception):
+    """Raised when a download is refused because of its size or content type"""
+
 
 class DossierBuilder:
     def __init__(self, llm_url="http://127.0.0.1:5000/v1/chat/completions",
                  max_page_tokens: int = 4000,
                  max_dossier_tokens: int = 16000,
-                 timeout: int = 60):
+                 timeout: int = 60,
+                 fetch_workers: int = 8,
+                 extract_workers: int = 2,
+                 analyze_workers: int = 4,
+                 queue_size: int = 16,
+                 host_rate: float = 0.5,
+                 page_cache_dir: Optional[str] = "results/page_cache",
+                 page_cache_ttl: float = 24 * 3600,
+                 page_cache_max_bytes: int = 512 * 1024 * 1024,
+                 llm_cache_path: Optional[str] = "results/llm_cache.sqlite3",
+                 bypass_llm_cache: bool = False,
+                 stream_dossier: bool = False,
+                 context_tokens: int = 32768,
+                 summary_tokens: int = 1500,
+                 reduce_workers: int = 2,
+                 page_input_tokens: int = 2000,
+                 tokenizer_path: Optional[str] = None,
+                 resume: bool = True,
+                 html_extractor: str = "auto",
+                 max_page_bytes: int = 10 * 1024 * 1024,
+                 near_dup_threshold: float = 0.85,
+                 rank: bool = False,
+                 min_score: float = 0.0,
+                 max_analyze: Optional[int] = None,
+                 batch_pages: int = 1,
+                 search_cache_path: Optional[str] = "results/search_cache.sqlite3",
+                 search_cache_ttl: float = 6 * 3600):
         self.search_engine = DDGS()
         self.llm_url = llm_url
         self.max_page_tokens = max_page_tokens
         self.max_dossier_tokens = max_dossier_tokens
         self.timeout = timeout
+        self.fetch_workers = fetch_workers
+        self.extract_workers = extract_workers
+        self.analyze_workers = analyze_workers
+        self.queue_size = queue_size
+        self.stream_dossier = stream_dossier
+        self.context_tokens = context_tokens
+        self.summary_tokens = summary_tokens
+        self.reduce_workers = reduce_workers
+        self.page_input_tokens = page_input_tokens
+        self.resume = resume
+        self.html_extractor = get_extractor(html_extractor)
+        self.max_page_bytes = max_page_bytes
+        self.pdf_analyzer = None  # Created on first PDF result
+        self.near_dup_threshold = near_dup_threshold
+        self.near_dup_index: Optional[NearDuplicateIndex] = None
+        self.rank = rank
+        self.min_score = min_score
+        self.max_analyze = max_analyze
+        self.batch_pages = batch_pages
+        self.token_counter = TokenCounter(llm_url, tokenizer_path)
+        self.last_dossier_stats: Dict[str, float] = {}
+        self.last_pipeline_stats: Dict[str, Dict] = {}
+        self.last_llm_stats: Dict[str, float] = {}
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Size the connection pool for the concurrent fetchers
+        adapter = HTTPAdapter(pool_connections=fetch_workers, pool_maxsize=fetch_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Per-host token bucket replaces the old global sleep between pages
+        self.rate_limiter = HostRateLimiter(rate_per_host=host_rate)
+        # On-disk page cache so reruns skip pages that were already downloaded
+        self.page_cache = PageCache(
+            page_cache_dir, ttl=page_cache_ttl, max_bytes=page_cache_max_bytes
+        ) if page_cache_dir else None
+        # Reruns of the same search reuse recent engine results
+        self.search_cache = SearchCache(search_cache_path, ttl=search_cache_ttl) if search_cache_path else None
+        # One pooled client (with retries and response cache) for all LLM calls
+        self.llm_client = LLMClient(
+            llm_url,
+            timeout=timeout,
+            pool_size=max(analyze_workers, reduce_workers, 1),
+            cache=LLMCache(llm_cache_path, bypass=bypass_llm_cache) if llm_cache_path else None
+        )
         
         logging.basicConfig(
             level=logging.INFO,
@@ -34,33 +131,68 @@ class DossierBuilder:
         
     def search(self, main_query: str, additional_terms: List[str], site: Optional[str] = None, max_results: int = 25) -> List[Dict]:
         """Perform OSINT search with combined terms"""
+        return list(self.iter_search(main_query, additional_terms, site, max_results))
+
+    def _raw_results(self, search_query: str, max_results: int) -> Iterator[Dict]:
+        """Yield search engine results as they arrive, caching the complete set"""
+        if self.search_cache:
+            cached = self.search_cache.get(search_query, max_results)
+            if cached is not None:
+                self.logger.info(f"Using {len(cached)} cached search results")
+                yield from cached
+                return
+        
+        # Get results with retry mechanism
+        results = []
+        seen = set()
+        try_count = 0
+        max_tries = 3
+        while try_count < max_tries:
+            try:
+                # DDGS.text returns a complete list only once every result page is downloaded, so
+                # first ask for the engine's first page alone (max_results=None) to start fetching
+                # after one round trip, then for the full set, skipping the repeated first page
+                for limit in (None, max_results):
+                    for result in self.search_engine.text(search_query, max_results=limit) or []:
+                        key = result.get('href') if isinstance(result, dict) else None
+                        if len(results) >= max_results or (key is not None and key in seen):
+                            continue
+                        seen.add(key)
+                        results.append(result)
+                        yield result
+                    if len(results) >= max_results:
+                        break
+                break
+            except Exception as e:
+                # Results already handed out can't be taken back, so only retry before the first one
+                if results:
+                    self.logger.error(f"Search interrupted after {len(results)} results: {str(e)}")
+                    return
+                try_count += 1
+                if try_count == max_tries:
+                    raise e
+                sleep(2)  # Wait before retry
+        
+        if self.search_cache:
+            self.search_cache.put(search_query, max_results, results)
+
+    def iter_search(self, main_query: str, additional_terms: List[str], site: Optional[str] = None,
+                    max_results: int = 25) -> Iterator[Dict]:
+        """Yield relevant search results as they arrive, so fetching can start on the first page of hits"""
         try:
             # Build search query
             search_query = self.build_search_query(main_query, additional_terms, site)
             self.logger.info(f"Searching for: {search_query}")
             
-            # Get results with retry mechanism
-            try_count = 0
-            max_tries = 3
-            while try_count < max_tries:
-                try:
-                    results = list(self.search_engine.text(search_query, max_results=max_results))
-                    break
-                except Exception as e:
-                    try_count += 1
-                    if try_count == max_tries:
-                        raise e
-                    sleep(2)  # Wait before retry
-            
             # Filter results that contain the main query
-            filtered_results = []
-            for result in results:
+            found = 0
+            for result in self._raw_results(search_query, max_results):
                 if isinstance(result, dict) and all(k in result for k in ['title', 'body', 'href']):
                     if main_query.lower() in (result['title'] + result['body'] + result['href']).lower():
-                        filtered_results.append(result)
+                        found += 1
+                        yield result
             
-            self.logger.info(f"Found {len(filtered_results)} relevant results")
-            return filtered_results
+            self.logger.info(f"Found {found} relevant results")
             
         except Exception as e:
             self.logger.error(f"Search failed: {str(e)}")
@@ -77,30 +209,133 @@ class DossierBuilder:
             combined_query = f"site:{site} {combined_query}"
         return combined_query
 
-    def fetch_webpage_content(self, url: str) -> Optional[str]:
-        """Fetch and extract clean text content from a webpage"""
+    def download_page(self, url: str) -> Optional[Dict]:
+        """Download a webpage, honouring the page cache and the per-host rate limit"""
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            entry = self.page_cache.lookup(url) if self.page_cache else None
+            headers = {}
+            if entry:
+                if entry["fresh"]:
+                    return self._cached_page(entry)
+                # Stale entry: ask the server whether our copy is still current
+                if entry["etag"]:
+                    headers['If-None-Match'] = entry["etag"]
+                if entry["last_modified"]:
+                    headers['If-Modified-Since'] = entry["last_modified"]
             
-            # Parse HTML with BeautifulSoup
-            soup = BeautifulSoup(response.text, 'html.parser')
+            self.rate_limiter.acquire(url)
+            # Stream the body so oversized or unwanted downloads can be abandoned early
+            with self.session.get(url, timeout=30, headers=headers, stream=True) as response:
+                if entry and response.status_code == 304:
+                    self.page_cache.mark_revalidated(url)
+                    return self._cached_page(entry)
+                response.raise_for_status()
+                
+                content_type = response.headers.get('Content-Type')
+                media_type = self._media_type(content_type)
+                if media_type and media_type not in SUPPORTED_TYPES:
+                    raise PageRejected(f"unsupported content type {media_type}")
+                
+                content_length = response.headers.get('Content-Length', '')
+                if content_length.isdigit() and int(content_length) > self.max_page_bytes:
+                    raise PageRejected(f"Content-Length {content_length} exceeds {self.max_page_bytes} bytes")
+                
+                body = self._read_capped(response)
             
-            # Remove script and style elements
-            for element in soup(['script', 'style', 'header', 'footer', 'nav']):
-                element.decompose()
+            page = {
+                "url": url,
+                "body": body,
+                "encoding": detect_encoding(body, content_type),
+                "content_type": content_type,
+                "text": None
+            }
+            if self.page_cache:
+                self.page_cache.store_page(
+                    url, page["body"],
+                    content_type=page["content_type"],
+                    encoding=page["encoding"],
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified')
+                )
+            return page
             
-            # Get text content
-            text = soup.get_text(separator='\n', strip=True)
+        except PageRejected as e:
+            self.logger.info(f"Skipping {url}: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Failed to fetch {url}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _media_type(content_type: Optional[str]) -> str:
+        """Media type of a Content-Type header without parameters, e.g. 'text/html'"""
+        return (content_type or '').split(';')[0].strip().lower()
+
+    def _read_capped(self, response: requests.Response) -> bytes:
+        """Read a streamed response body, giving up once it exceeds max_page_bytes"""
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            received += len(chunk)
+            if received > self.max_page_bytes:
+                raise PageRejected(f"body exceeds {self.max_page_bytes} bytes")
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def _cached_page(self, entry: Dict) -> Dict:
+        """Build a page from a cache entry, skipping the body when text is already cached"""
+        text = self.page_cache.read_text(entry)
+        return {
+            "url": entry["url"],
+            "body": None if text is not None else self.page_cache.read_blob(entry["body_hash"]),
+            "encoding": entry["encoding"],
+            "content_type": entry["content_type"],
+            "text": text
+        }
+
+    def extract_page_text(self, page: Dict) -> Optional[str]:
+        """Extract clean text content from a downloaded webpage"""
+        if page.get("text") is not None:
+            return page["text"]
+        
+        try:
+            media_type = self._media_type(page.get("content_type"))
+            
+            if media_type in PDF_TYPES or page["body"].startswith(b'%PDF-'):
+                text = self._pdf_text(page["body"])
+            elif media_type in TEXT_TYPES:
+                text = page["body"].decode(page["encoding"] or 'utf-8', errors='replace')
+            else:
+                html = page["body"].decode(page["encoding"] or 'utf-8', errors='replace')
+                
+                # Get text content without scripts, styles and navigation
+                text = self.html_extractor.extract(html)
             
             # Clean up excessive whitespace
             text = re.sub(r'\n\s*\n', '\n\n', text)
             
+            if self.page_cache:
+                self.page_cache.store_text(page["url"], text)
             return text
             
         except Exception as e:
-            self.logger.error(f"Failed to fetch {url}: {str(e)}")
+            self.logger.error(f"Failed to extract text from {page['url']}: {str(e)}")
+            return None
+
+    def _pdf_text(self, body: bytes) -> str:
+        """Extract text from a downloaded PDF with the report2dossier document analyzer"""
+        if self.pdf_analyzer is None:
+            # Imported lazily so HTML-only runs don't need the PDF dependencies
+            from report2dossier.pdf_analyzer import DocumentAnalyzer
+            self.pdf_analyzer = DocumentAnalyzer(llm_url=self.llm_url, llm_cache_path=None)
+        return self.pdf_analyzer.extract_text_from_bytes(body)
+
+    def fetch_webpage_content(self, url: str) -> Optional[str]:
+        """Fetch and extract clean text content from a webpage"""
+        page = self.download_page(url)
+        if page is None:
             return None
+        return self.extract_page_text(page)
 
     def _strip_think_tokens(self, text: str) -> str:
         """Remove <think></think> tokens and their content from text"""
@@ -110,9 +345,15 @@ class DossierBuilder:
         text = re.sub(r'\n\s*\n', '\n\n', text)
         return text.strip()
 
+    def _content_budget(self) -> int:
+        """Tokens of page text per analysis request, leaving room for the instructions and the answer"""
+        return min(self.page_input_tokens, self.context_tokens - self.max_page_tokens - 400)
+
     def analyze_page_content(self, content: str, url: str, main_query: str) -> Optional[Dict]:
         """Analyze a single webpage's content using LLM"""
         try:
+            content = self.token_counter.truncate(content, self._content_budget())
+            
             prompt = f"""Analyze the following webpage content about {main_query}.
             URL: {url}
             
@@ -128,28 +369,17 @@ class DossierBuilder:
             Provide only factual information found in the content. Format as clear, concise bullet points. If information is not found in the content don't reference that bullet point or say it wasn't found, just skip it.
             
             Content to analyze:
-            {content[:8000]}  # Limit content length for LLM
+            {content}
             """
 
-            data = {
-                "model": "gpt-3.5-turbo",
-                "messages": [
+            # Get the raw analysis and strip think tokens
+            raw_analysis = self.llm_client.chat(
+                [
                     {"role": "system", "content": "You are an OSINT analyst extracting key details from web content."},
                     {"role": "user", "content": prompt}
                 ],
-                "max_tokens": self.max_page_tokens
-            }
-
-            response = requests.post(
-                self.llm_url,
-                json=data,
-                headers={"Content-Type": "application/json"},
-                timeout=self.timeout
+                max_tokens=self.max_page_tokens
             )
-            response.raise_for_status()
-            
-            # Get the raw analysis and strip think tokens
-            raw_analysis = response.json()["choices"][0]["message"]["content"]
             cleaned_analysis = self._strip_think_tokens(raw_analysis)
             
             return {
@@ -162,152 +392,528 @@ class DossierBuilder:
             self.logger.error(f"Failed to analyze content from {url}: {str(e)}")
             return None
 
-    def process_search_results(self, results: List[Dict], main_query: str) -> Path:
+    @staticmethod
+    def _split_batch_analysis(text: str, count: int) -> List[str]:
+        """Split a batched analysis into per-page sections, or raise ValueError if any are missing"""
+        sections: Dict[int, str] = {}
+        parts = BATCH_SECTION.split(text)
+        # re.split with one group gives [preamble, number, body, number, body, ...]
+        for number, body in zip(parts[1::2], parts[2::2]):
+            sections.setdefault(int(number), body.strip())
+        missing = [number for number in range(1, count + 1) if number not in sections]
+        if missing:
+            raise ValueError(f"batched analysis is missing pages {missing}")
+        return [sections[number] for number in range(1, count + 1)]
+
+    def analyze_pages_batch(self, pages: List[Tuple[str, str]], main_query: str) -> Optional[List[Dict]]:
+        """Analyze several short (content, url) pages in one request, sharing the instructions"""
+        try:
+            sections = "\n\n".join(
+                f"=== PAGE {number} ===\nURL: {url}\n{self.token_counter.truncate(content, self._content_budget())}"
+                for number, (content, url) in enumerate(pages, 1)
+            )
+            
+            prompt = f"""Analyze the following {len(pages)} webpages about {main_query}. Each page starts with a line "=== PAGE n ===" followed by its URL.
+            
+            For each page separately, extract and summarize key details about the target focusing on:
+            1. Biographical information
+            2. Key dates and events
+            3. Contact information or identifiers
+            4. Locations mentioned
+            5. Associated people or organizations
+            6. Platform usage or digital footprint
+            7. Professional or educational history
+            
+            Provide only factual information found in that page's content. Format as clear, concise bullet points. If information is not found in a page don't reference that bullet point or say it wasn't found, just skip it.
+            
+            Answer with one section per page, in the same order, each starting with the exact line "=== PAGE n ===" using the page's number. Never merge pages. If a page has no relevant details, leave its section empty.
+            
+            Pages to analyze:
+            {sections}
+            """
+
+            raw_analysis = self.llm_client.chat(
+                [
+                    {"role": "system", "content": "You are an OSINT analyst extracting key details from web content."},
+                    {"role": "user", "content": prompt}
+                ],
+                # Every page gets the answer budget of a single-page analysis
+                max_tokens=len(pages) * self.max_page_tokens,
+                # A reply that can't be split per page is not cached, so the fallback doesn't replay it
+                validate=lambda content: self._split_batch_analysis(self._strip_think_tokens(content), len(pages))
+            )
+            analyses = self._split_batch_analysis(self._strip_think_tokens(raw_analysis), len(pages))
+            
+            return [
+                {
+                    "url": url,
+                    "analysis": analysis,
+                    "timestamp": Path().stat().st_mtime
+                }
+                for (_, url), analysis in zip(pages, analyses)
+            ]
+            
+        except Exception as e:
+            self.logger.warning(f"Batched analysis of {len(pages)} pages failed, analyzing them one by one: {str(e)}")
+            return None
+
+    def _fetch_stage(self, job: Dict) -> Optional[Dict]:
+        """Pipeline stage: download the page for a search result"""
+        job["page"] = self.download_page(job["url"])
+        return job if job["page"] else None
+
+    def _extract_stage(self, job: Dict) -> Optional[Dict]:
+        """Pipeline stage: turn the downloaded page into plain text"""
+        job["content"] = self.extract_page_text(job.pop("page"))
+        return job if job["content"] else None
+
+    def _dedupe_stage(self, job: Dict) -> Optional[Dict]:
+        """Pipeline stage: mark pages that nearly duplicate an earlier page so analysis is skipped"""
+        fingerprint = simhash(job["content"])
+        # Saved with the analysis so a resumed run can still match mirrors of this page
+        job["simhash"] = f"{fingerprint:016x}"
+        match = self.near_dup_index.check_and_add(job["url"], fingerprint)
+        if match:
+            job["duplicate_of"], job["similarity"] = match
+            self.logger.info(f"Skipping near-duplicate {job['url']} (similarity {job['similarity']} to {job['duplicate_of']})")
+        return job
+
+    def _analyze_stage(self, job: Dict) -> Optional[Dict]:
+        """Pipeline stage: run the LLM analysis over the page text"""
+        content = job.pop("content")
+        if job.get("duplicate_of"):
+            return job
+        job["analysis"] = self.analyze_page_content(content, job["url"], job["query"])
+        return job if job["analysis"] else None
+
+    def _page_tokens(self, job: Dict) -> int:
+        """Prompt tokens a page will take up in an analysis request"""
+        if job.get("duplicate_of"):
+            return 0
+        return self.token_counter.count_within(job["content"], self._content_budget())
+
+    def _max_batch_pages(self) -> int:
+        """Most pages whose answers fit one request next to the instructions"""
+        return max(1, min(self.batch_pages, (self.context_tokens - 400) // self.max_page_tokens))
+
+    def _batch_fits(self, batch: List[Dict], job: Dict) -> bool:
+        """Whether a page can join an analysis batch without exceeding the text or answer budget"""
+        pages = batch + [job]
+        input_tokens = sum(self._page_tokens(page) for page in pages)
+        output_tokens = sum(1 for page in pages if not page.get("duplicate_of")) * self.max_page_tokens
+        return (input_tokens <= self._content_budget()
+                and input_tokens + output_tokens <= self.context_tokens - 400)
+
+    def _analyze_batch_stage(self, jobs: List[Dict]) -> List[Optional[Dict]]:
+        """Pipeline stage: analyze a batch of pages, in one request when there are several short ones"""
+        pending = [job for job in jobs if not job.get("duplicate_of")]
+        analyses = None
+        if len(pending) > 1:
+            analyses = self.analyze_pages_batch([(job["content"], job["url"]) for job in pending], pending[0]["query"])
+        if analyses is None:
+            analyses = [self.analyze_page_content(job["content"], job["url"], job["query"]) for job in pending]
+        
+        for job, analysis in zip(pending, analyses):
+            job["analysis"] = analysis
+        
+        outputs = []
+        for job in jobs:
+            job.pop("content")
+            outputs.append(job if job.get("duplicate_of") or job["analysis"] else None)
+        return outputs
+
+    def _near_dup_index(self, existing: List[Dict]) -> NearDuplicateIndex:
+        """Near-duplicate index seeded with the pages an earlier run already analyzed"""
+        index = NearDuplicateIndex(self.near_dup_threshold)
+        for result in existing:
+            # Results saved before fingerprints were stored can't be matched against
+            if result.get("simhash"):
+                index.add(result["url"], int(result["simhash"], 16))
+        return index
+
+    def build_pipeline(self, prepare: bool = True, analyze: bool = True) -> Pipeline:
+        """Create the fetch -> extract -> (dedupe ->) analyze pipeline, or either half of it"""
+        stages = []
+        if prepare:
+            stages.append(Stage("fetch", self._fetch_stage, self.fetch_workers))
+            stages.append(Stage("extract", self._extract_stage, self.extract_workers))
+            if self.near_dup_threshold > 0:
+                if self.near_dup_index is None:
+                    self.near_dup_index = NearDuplicateIndex(self.near_dup_threshold)
+                stages.append(Stage("dedupe", self._dedupe_stage, 1))
+        if analyze and self._max_batch_pages() > 1:
+            stages.append(Stage(
+                "analyze", self._analyze_batch_stage, self.analyze_workers,
+                batch_size=self._max_batch_pages(), batch_fits=self._batch_fits
+            ))
+        elif analyze:
+            stages.append(Stage("analyze", self._analyze_stage, self.analyze_workers))
+        return Pipeline(stages, queue_size=self.queue_size, logger=self.logger)
+
+    def _rank_jobs(self, jobs: List[Dict], main_query: str, additional_terms: List[str]) -> List[Dict]:
+        """Order prepared pages by BM25 relevance to the query, dropping those below min_score"""
+        query = " ".join([main_query] + additional_terms)
+        scores = relative_scores(bm25_scores(query, [job["content"] for job in jobs]))
+        for job, score in zip(jobs, scores):
+            job["relevance_score"] = score
+        
+        ranked = sorted(
+            (job for job in jobs if job["relevance_score"] >= self.min_score),
+            key=lambda job: job["relevance_score"], reverse=True
+        )
+        if len(ranked) < len(jobs):
+            self.logger.info(f"Skipping {len(jobs) - len(ranked)} pages scoring below {self.min_score}")
+        if self.max_analyze is not None and len(ranked) > self.max_analyze:
+            self.logger.info(f"Analyzing only the top {self.max_analyze} of {len(ranked)} pages")
+            ranked = ranked[:self.max_analyze]
+        for job in ranked:
+            self.logger.info(f"Relevance {job['relevance_score']:.3f}: {job['url']}")
+        return ranked
+
+    def _unprocessed_results(self, results: Iterable[Dict], seen_urls: Set[str]) -> Iterator[Dict]:
+        """Yield valid results whose canonical URL has not been processed yet"""
+        for result in results:
+            # Skip if URL seems invalid
+            if not urlparse(result['href']).scheme:
+                continue
+            
+            canonical = canonicalize_url(result['href'])
+            if canonical in seen_urls:
+                self.logger.info(f"Skipping already processed URL: {result['href']}")
+                continue
+            seen_urls.add(canonical)
+            yield result
+
+    def process_search_results(self, results: Iterable[Dict], main_query: str,
+                               additional_terms: Optional[List[str]] = None) -> Path:
         """Process each search result individually and save distilled information"""
         Path("results").mkdir(exist_ok=True)
         safe_query = re.sub(r'[^\w\-_\. ]', '_', main_query)
         distilled_path = Path("results") / f"{safe_query}_distilled.json"
         
-        processed_data = []
-        result_number = 1  # Initialize counter
+        # Progress is appended to a JSONL store and compacted to JSON at the end
+        store = DistilledStore(distilled_path.with_suffix('.jsonl'))
+        if self.resume:
+            existing = store.resume({"target": main_query}, legacy_path=distilled_path)
+        else:
+            store.open({"target": main_query})
+            existing = []
         
-        for result in results:
-            url = result['href']
-            self.logger.info(f"Processing result {result_number}: {url}")
+        # Continue numbering after what an interrupted run already saved
+        seen_urls = {canonicalize_url(result["url"]) for result in existing}
+        seen_urls.update(
+            canonicalize_url(duplicate["url"])
+            for result in existing for duplicate in result.get("near_duplicates", [])
+        )
+        result_number = max((result["result_number"] for result in existing), default=0) + 1  # Initialize counter
+        if self.near_dup_threshold > 0:
+            self.near_dup_index = self._near_dup_index(existing)
+        if existing:
+            self.logger.info(f"Resuming: {len(existing)} results already analyzed, continuing at result {result_number}")
+        
+        jobs = (
+            {"url": result['href'], "title": result.get('title', ''), "query": main_query}
+            for result in self._unprocessed_results(results, seen_urls)
+        )
+        
+        pipelines = []
+        try:
+            if self.rank:
+                # Ranking needs every page's text, so all pages are fetched before analysis starts
+                preparation = self.build_pipeline(analyze=False)
+                pipelines.append(preparation)
+                prepared = []
+                for _, job, output in preparation.run(jobs):
+                    if output is None:
+                        continue
+                    if output.get("duplicate_of"):
+                        store.append_duplicate(job["url"], output["duplicate_of"], output["similarity"])
+                        continue
+                    prepared.append(output)
+                
+                # Best pages first, so an interrupted or limited run has spent its LLM time well
+                jobs = self._rank_jobs(prepared, main_query, additional_terms or [])
+                pipeline = self.build_pipeline(prepare=False)
+            else:
+                # Fetching, extraction and analysis overlap; results come back in search order
+                pipeline = self.build_pipeline()
+            pipelines.append(pipeline)
             
-            # Skip if URL seems invalid
-            if not urlparse(url).scheme:
-                continue
+            for _, job, output in pipeline.run(jobs):
+                if output is None:
+                    continue
+                
+                if output.get("duplicate_of"):
+                    # Link to the canonical page's analysis instead of paying for another LLM call
+                    store.append_duplicate(job["url"], output["duplicate_of"], output["similarity"])
+                    continue
                 
-            # Fetch and analyze content
-            content = self.fetch_webpage_content(url)
-            if content:
-                analysis = self.analyze_page_content(content, url, main_query)
-                if analysis:
-                    # Add result number to the analysis
-                    analysis.update({
-                        "result_number": result_number,
-                        "original_title": result.get('title', '')
-                    })
-                    
-                    processed_data.append(analysis)
-                    
-                    # Save progress after each successful analysis
-                    with distilled_path.open('w', encoding='utf-8') as f:
-                        json.dump({
-                            "metadata": {
-                                "target": main_query,
-                                "total_results_processed": result_number,
-                                "last_updated": str(Path(distilled_path).stat().st_mtime if distilled_path.exists() else None)
-                            },
-                            "results": processed_data
-                        }, f, indent=2)
-                    
-                    result_number += 1  # Increment counter only for successfully processed results
-                    
-            # Be nice to servers
-            sleep(2)
+                self.logger.info(f"Processed result {result_number}: {job['url']}")
+                analysis = output["analysis"]
+                
+                # Add result number to the analysis
+                analysis.update({
+                    "result_number": result_number,
+                    "original_title": job["title"]
+                })
+                if "relevance_score" in job:
+                    analysis["relevance_score"] = job["relevance_score"]
+                if output.get("simhash"):
+                    analysis["simhash"] = output["simhash"]
+                
+                # Save progress after each successful analysis
+                store.append(analysis)
+                
+                result_number += 1  # Increment counter only for successfully processed results
+        finally:
+            store.close()
+        
+        store.compact(distilled_path)
+        
+        # Show which stage was the bottleneck
+        self.last_pipeline_stats = {}
+        for run in pipelines:
+            run.log_stats()
+            self.last_pipeline_stats.update(run.stats())
+        if self.near_dup_index:
+            self.last_pipeline_stats["dedupe"].update(self.near_dup_index.stats())
+            self.logger.info(f"Skipped {self.near_dup_index.duplicates} near-duplicate pages")
+        
+        # Concurrency the LLM endpoint settled on, out of analyze_workers
+        self.last_llm_stats = self.llm_client.limiter.stats()
+        self.logger.info(
+            f"LLM concurrency limit {self.last_llm_stats['limit']} (cut {self.last_llm_stats['decreases']} times), "
+            f"latency p50 {self.last_llm_stats['latency_p50']}s / p90 {self.last_llm_stats['latency_p90']}s / "
+            f"p99 {self.last_llm_stats['latency_p99']}s"
+        )
             
         return distilled_path
 
+    def _stream_dossier(self, messages: List[Dict], metadata_header: str, dossier_path: Path) -> str:
+        """Stream the dossier completion straight into the output file"""
+        stripper = ThinkStripper()
+        parts = []
+        chunks = 0
+        first_token_at = None
+        start = monotonic()
+        
+        with dossier_path.open('w', encoding='utf-8') as f:
+            f.write(metadata_header)
+            for delta in self.llm_client.stream_chat(
+                messages,
+                max_tokens=self.max_dossier_tokens,
+                temperature=0.7  # Add some variability to encourage more detailed responses
+            ):
+                if first_token_at is None:
+                    first_token_at = monotonic()
+                chunks += 1
+                text = stripper.feed(delta)
+                if text:
+                    f.write(text)
+                    f.flush()  # Keep partial output on disk if generation dies
+                    parts.append(text)
+            text = stripper.flush()
+            f.write(text)
+            parts.append(text)
+        
+        # Streamed chunks are roughly one token each on OpenAI-compatible servers
+        end = monotonic()
+        generation_time = end - (first_token_at or end)
+        self.last_dossier_stats = {
+            "time_to_first_token": round((first_token_at or end) - start, 3),
+            "stream_chunks": chunks,
+            "tokens_per_second": round(chunks / generation_time, 2) if generation_time > 0 else 0.0
+        }
+        self.logger.info(
+            f"Dossier streamed: first token after {self.last_dossier_stats['time_to_first_token']}s, "
+            f"{self.last_dossier_stats['tokens_per_second']} tokens/s"
+        )
+        return "".join(parts)
+
+    def _build_dossier_prompt(self, main_query: str, additional_terms: List[str],
+                              total_sources: int, domain_count: int,
+                              material_label: str, material: str) -> str:
+        """Build the final dossier prompt around the given source material"""
+        return f"""Create a comprehensive intelligence dossier for target '{main_query}' using data from {total_sources} sources across {domain_count} distinct domains.
+        Additional context terms: {', '.join(additional_terms)}
+
+        Generate an extensive, detailed analysis that thoroughly covers ALL available information. You have up to {self.max_dossier_tokens} tokens available - use them to provide the most comprehensive dossier possible.
+
+        Structure the dossier with the following sections, providing extensive detail for each:
+
+        1. EXECUTIVE SUMMARY
+        - High-confidence key findings
+        - Reliability assessment of sources
+        - Major intelligence gaps
+
+        2. IDENTITY AND BACKGROUND
+        - Core identifiers and accounts
+        - Biographical information
+        - Professional/educational history
+        - Location history and geographic associations
+
+        3. DETAILED TIMELINE
+        - Chronological analysis of all dated events and activities
+        - Pattern analysis across time periods
+
+        4. ASSOCIATIONS AND RELATIONSHIPS
+        - Personal connections
+        - Professional networks
+        - Organizational affiliations
+        - Platform and service usage
+
+        5. TECHNICAL FOOTPRINT
+        - Digital platforms and services
+        - Technical indicators
+        - Online behavior patterns
+        - Account correlation analysis
+
+        6. GEOGRAPHIC ANALYSIS
+        - Confirmed locations
+        - Probable locations based on evidence
+        - Travel patterns if apparent
+        - Geographic points of interest
+
+        7. SOURCE ANALYSIS
+        - Detailed evaluation of each significant source
+        - Cross-reference patterns
+        - Conflicting information assessment
+        - Source reliability matrix
+
+        8. INTELLIGENCE GAPS AND UNCERTAINTIES
+        - Identified information gaps
+        - Conflicting data points
+        - Alternative hypotheses
+        - Recommended additional collection vectors
+
+        For each section:
+        - Provide extensive detail
+        - Include specific examples and evidence
+        - Cross-reference information across sources
+        - Assess confidence levels
+        - Note contradictions or uncertainties
+        - Cite source numbers [Result #X] for key findings
+
+        {material_label}:
+        {material}"""
+
+    def _serialize_results(self, results: List[Dict]) -> List[str]:
+        """Compact one-line JSON per distilled result, keeping only what the dossier needs"""
+        return [
+            json.dumps({
+                "result_number": result.get("result_number"),
+                "url": result.get("url"),
+                "title": result.get("original_title", ""),
+                "analysis": result.get("analysis", ""),
+                **({"mirrors": [duplicate["url"] for duplicate in result["near_duplicates"]]}
+                   if result.get("near_duplicates") else {})
+            }, separators=(',', ':'), ensure_ascii=False)
+            for result in results
+        ]
+
+    def _pack_batches(self, items: List[str], budget: int) -> List[List[str]]:
+        """Greedily pack items into batches that stay within a token budget"""
+        batches = []
+        current = []
+        current_tokens = 0
+        for item in items:
+            item_tokens = self.token_counter.count(item)
+            if item_tokens > budget:
+                # A single oversized item is cut down to fit on its own
+                item = self.token_counter.truncate(item, budget)
+                item_tokens = budget
+            if current and current_tokens + item_tokens > budget:
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(item)
+            current_tokens += item_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _summarize_batch(self, batch: List[str], main_query: str, level: int) -> str:
+        """Condense a batch of analyses (or partial summaries) into one partial summary"""
+        if level == 0:
+            instructions = f"""Condense the following OSINT source analyses about '{main_query}' into a dense factual summary.
+            Each line is a JSON object for one search result; cite it as [Result #<result_number>]."""
+        else:
+            instructions = f"""Merge the following partial intelligence summaries about '{main_query}' into one dense factual summary.
+            Combine overlapping facts instead of repeating them."""
+        
+        prompt = f"""{instructions}
+            
+            Keep every concrete detail: names, identifiers, accounts, dates, locations, organizations and relationships.
+            Cite the supporting source for every fact using [Result #X] notation exactly as it appears, and keep all citations when facts are merged.
+            Note any contradictions between sources.
+            
+            Material:
+            {chr(10).join(batch)}"""
+        
+        summary = self.llm_client.chat(
+            [
+                {"role": "system", "content": "You are an OSINT analyst condensing source material for a later intelligence dossier."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=self.summary_tokens,
+            temperature=0.3
+        )
+        return self._strip_think_tokens(summary)
+
+    def _prepare_dossier_material(self, results: List[Dict], main_query: str, additional_terms: List[str],
+                                  total_sources: int, domain_count: int) -> Tuple[str, str]:
+        """Return (label, material) for the final prompt, map-reducing results that overflow the context"""
+        items = self._serialize_results(results)
+        
+        overhead = self.token_counter.count(self._build_dossier_prompt(
+            main_query, additional_terms, total_sources, domain_count, "Raw Data for Analysis", ""
+        )) + 200  # System prompt and chat template
+        final_budget = max(self.context_tokens - self.max_dossier_tokens - overhead, 1024)
+        
+        if sum(self.token_counter.count(item) for item in items) <= final_budget:
+            return "Raw Data for Analysis", "\n".join(items)
+        
+        # Map: condense batches of analyses; reduce: merge partial summaries until they fit
+        batch_budget = max(self.context_tokens - self.summary_tokens - 600, 1024)
+        level = 0
+        while sum(self.token_counter.count(item) for item in items) > final_budget:
+            batches = self._pack_batches(items, batch_budget)
+            if level > 0 and len(batches) == len(items):
+                # Summaries no longer shrink when merged; keep as much as fits
+                items = self._pack_batches(items, final_budget)[0]
+                break
+            self.logger.info(f"Dossier reduce level {level}: condensing {len(items)} items into {len(batches)} partial summaries")
+            with ThreadPoolExecutor(max_workers=max(self.reduce_workers, 1)) as executor:
+                items = list(executor.map(lambda batch: self._summarize_batch(batch, main_query, level), batches))
+            level += 1
+        
+        return "Partial Summaries for Analysis", "\n\n".join(items)
+
     def generate_final_dossier(self, distilled_path: Path, main_query: str, additional_terms: List[str]) -> Optional[Path]:
         """Generate final dossier from distilled information"""
         try:
             # Read distilled data
-            with distilled_path.open('r', encoding='utf-8') as f:
-                distilled_data = json.load(f)
+            distilled_data = load_distilled(distilled_path)
 
             # Calculate statistics for prompt context
             total_sources = len(distilled_data["results"])
             domains = set(urlparse(result["url"]).netloc for result in distilled_data["results"])
             
-            prompt = f"""Create a comprehensive intelligence dossier for target '{main_query}' using data from {total_sources} sources across {len(domains)} distinct domains.
-            Additional context terms: {', '.join(additional_terms)}
-
-            Generate an extensive, detailed analysis that thoroughly covers ALL available information. You have up to {self.max_dossier_tokens} tokens available - use them to provide the most comprehensive dossier possible.
-
-            Structure the dossier with the following sections, providing extensive detail for each:
-
-            1. EXECUTIVE SUMMARY
-            - High-confidence key findings
-            - Reliability assessment of sources
-            - Major intelligence gaps
-
-            2. IDENTITY AND BACKGROUND
-            - Core identifiers and accounts
-            - Biographical information
-            - Professional/educational history
-            - Location history and geographic associations
-
-            3. DETAILED TIMELINE
-            - Chronological analysis of all dated events and activities
-            - Pattern analysis across time periods
-
-            4. ASSOCIATIONS AND RELATIONSHIPS
-            - Personal connections
-            - Professional networks
-            - Organizational affiliations
-            - Platform and service usage
-
-            5. TECHNICAL FOOTPRINT
-            - Digital platforms and services
-            - Technical indicators
-            - Online behavior patterns
-            - Account correlation analysis
-
-            6. GEOGRAPHIC ANALYSIS
-            - Confirmed locations
-            - Probable locations based on evidence
-            - Travel patterns if apparent
-            - Geographic points of interest
-
-            7. SOURCE ANALYSIS
-            - Detailed evaluation of each significant source
-            - Cross-reference patterns
-            - Conflicting information assessment
-            - Source reliability matrix
-
-            8. INTELLIGENCE GAPS AND UNCERTAINTIES
-            - Identified information gaps
-            - Conflicting data points
-            - Alternative hypotheses
-            - Recommended additional collection vectors
-
-            For each section:
-            - Provide extensive detail
-            - Include specific examples and evidence
-            - Cross-reference information across sources
-            - Assess confidence levels
-            - Note contradictions or uncertainties
-            - Cite source numbers [Result #X] for key findings
-
-            Raw Data for Analysis:
-            {json.dumps(distilled_data, indent=2)}"""
-
-            data = {
-                "model": "gpt-3.5-turbo",
-                "messages": [
-                    {"role": "system", "content": """You are an expert OSINT analyst creating detailed intelligence dossiers.
-                    Your task is to create the most comprehensive analysis possible using all available token space.
-                    Include specific details, examples, and evidence rather than general statements.
-                    Always cite sources using [Result #X] notation."""},
-                    {"role": "user", "content": prompt}
-                ],
-                "max_tokens": self.max_dossier_tokens,
-                "temperature": 0.7  # Add some variability to encourage more detailed responses
-            }
-
-            response = requests.post(
-                self.llm_url,
-                json=data,
-                headers={"Content-Type": "application/json"},
-                timeout=self.timeout
+            # Condense the distilled analyses until they fit the model's context
+            material_label, material = self._prepare_dossier_material(
+                distilled_data["results"], main_query, additional_terms, total_sources, len(domains)
             )
-            response.raise_for_status()
-            
-            # Get the raw dossier content and strip think tokens
-            raw_dossier_content = response.json()["choices"][0]["message"]["content"]
-            dossier_content = self._strip_think_tokens(raw_dossier_content)
+            prompt = self._build_dossier_prompt(
+                main_query, additional_terms, total_sources, len(domains), material_label, material
+            )
+
+            messages = [
+                {"role": "system", "content": """You are an expert OSINT analyst creating detailed intelligence dossiers.
+                Your task is to create the most comprehensive analysis possible using all available token space.
+                Include specific details, examples, and evidence rather than general statements.
+                Always cite sources using [Result #X] notation."""},
+                {"role": "user", "content": prompt}
+            ]
             
             # Add metadata header to dossier
             metadata_header = f"""# OSINT Dossier: {main_query}
@@ -326,13 +932,25 @@ class DossierBuilder:
             
             dossier_path = Path("results") / f"{main_query}_final_dossier.md"
             
-            with dossier_path.open('w', encoding='utf-8') as f:
-                f.write(metadata_header)
-                f.write(dossier_content)
+            if self.stream_dossier:
+                dossier_content = self._stream_dossier(messages, metadata_header, dossier_path)
+            else:
+                # Get the raw dossier content and strip think tokens
+                raw_dossier_content = self.llm_client.chat(
+                    messages,
+                    max_tokens=self.max_dossier_tokens,
+                    temperature=0.7,  # Add some variability to encourage more detailed responses
+                    use_cache=False
+                )
+                dossier_content = self._strip_think_tokens(raw_dossier_content)
+                
+                with dossier_path.open('w', encoding='utf-8') as f:
+                    f.write(metadata_header)
+                    f.write(dossier_content)
             
-            # Log token usage estimation
-            approx_tokens = len(dossier_content.split()) * 1.3  # Rough estimation
-            self.logger.info(f"Estimated dossier token usage: {int(approx_tokens)} of {self.max_dossier_tokens} available")
+            # Log token usage
+            dossier_tokens = self.token_counter.count(dossier_content)
+            self.logger.info(f"Dossier token usage: {dossier_tokens} of {self.max_dossier_tokens} available")
             
             return dossier_path
             
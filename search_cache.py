@@ -0,0 +1,57 @@
+# search_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class SearchCache:
+    """SQLite-backed TTL cache of raw search engine results.
+
+    Entries are keyed on the exact search query and max_results, so reruns
+    of the same search skip the engine (and its rate limits) until the entry
+    is older than `ttl` seconds.
+    """
+
+    def __init__(self, path: str = "results/search_cache.sqlite3", ttl: float = 6 * 3600):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""CREATE TABLE IF NOT EXISTS searches (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                results TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )""")
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> str:
+        encoded = json.dumps([query, max_results], ensure_ascii=False)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def get(self, query: str, max_results: int) -> Optional[List[Dict]]:
+        """Return cached results for a search if they are younger than the TTL"""
+        key = self.make_key(query, max_results)
+        with self.lock:
+            row = self.db.execute("SELECT results, created_at FROM searches WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, query: str, max_results: int, results: List[Dict]) -> None:
+        """Store the complete result list of a search"""
+        key = self.make_key(query, max_results)
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO searches (key, query, results, created_at) VALUES (?, ?, ?, ?)",
+                (key, query, json.dumps(results, ensure_ascii=False), time.time())
+            )
+            self.db.execute("DELETE FROM searches WHERE created_at < ?", (time.time() - self.ttl,))
@@ -0,0 +1,42 @@
+# tests/test_chunk_engine.py
+import json
+import sys
+from pathlib import Path
+
+import requests
+
+# Allow running as `pytest tests/` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from report2dossier.chunk_engine import ChunkEngine
+
+
+def run_one(func):
+    engine = ChunkEngine(workers=1, retries=2, backoff=0)
+    [(_, _, result, error)] = list(engine.run(["chunk"], func))
+    return result, error
+
+
+def test_invalid_output_is_retried():
+    calls = []
+
+    def flaky(chunk):
+        calls.append(chunk)
+        if len(calls) < 3:
+            raise json.JSONDecodeError("Expecting value", "", 0)
+        return {"people": []}
+
+    assert run_one(flaky) == ({"people": []}, None)
+    assert len(calls) == 3
+
+
+def test_transport_errors_are_not_retried_again():
+    calls = []
+
+    def timing_out(chunk):
+        calls.append(chunk)
+        raise requests.Timeout("read timed out")
+
+    result, error = run_one(timing_out)
+    assert result is None and isinstance(error, requests.Timeout)
+    assert len(calls) == 1
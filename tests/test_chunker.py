@@ -0,0 +1,98 @@
+# tests/test_chunker.py
+import sys
+from pathlib import Path
+
+# Allow running as `pytest tests/` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from report2dossier.chunker import StreamingChunker
+from report2dossier.txt2list import EntityExtractor
+from token_counter import TokenCounter
+
+TEXT = ("Jonathan Smith joined Microsoft Corporation in 1999. "
+        "He later met Dr. Alice Wong at the Acme Institute.\n\n"
+        "Both of them moved to Berlin afterwards. ") * 20
+
+
+def test_stream_blocks_are_joined_without_separator(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text(TEXT, encoding='utf-8')
+    extractor = EntityExtractor(url="http://127.0.0.1:9/v1/chat/completions", llm_cache_path=None,
+                                chunk_tokens=60, overlap_tokens=0)
+
+    chunks = [chunk for chunk, _ in extractor.iter_file_chunks(path, block_size=7)]
+
+    joined = ' '.join(chunks)
+    assert "Jonathan Smith" in joined and "Microsoft Corporation" in joined
+    assert ' '.join(joined.split()) == ' '.join(TEXT.split())
+
+
+def test_page_texts_are_kept_apart():
+    chunker = StreamingChunker(TokenCounter(), max_tokens=100)
+    assert list(chunker.chunks(["last line of page one", "first line of page two"])) == [
+        "last line of page one first line of page two"
+    ]
+    assert list(chunker.chunks(["Jonath", "an Smith"], separator="")) == ["Jonathan Smith"]
+
+
+def test_text_without_sentence_ends_is_cut_into_bounded_pieces():
+    chunker = StreamingChunker(TokenCounter(), max_tokens=50)
+    blocks = ["word " * 2000] * 4
+
+    sentences = list(chunker.sentences(blocks, separator=""))
+
+    assert max(len(sentence) for sentence in sentences) <= 50 * 16
+    assert ' '.join(sentences).split() == ("word " * 8000).split()
+
+
+def test_split_covers_the_text_in_order():
+    counter = TokenCounter()
+    text = "alpha beta gamma delta " * 500
+
+    pieces = counter.split(text, 20)
+
+    assert all(counter.count(piece) <= 20 for piece in pieces)
+    assert ' '.join(pieces).split() == text.split()
+
+
+class ServerCounter(TokenCounter):
+    """Stands in for a tokenize endpoint: more tokens than the estimate, one request per count"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+
+    def _count_uncached(self, text: str) -> int:
+        self.requests += 1
+        return TokenCounter.estimate(text) * 7 // 5
+
+
+def test_chunks_are_counted_once_not_per_sentence():
+    counter = ServerCounter()
+    chunker = StreamingChunker(counter, max_tokens=120, overlap_tokens=20)
+
+    chunks = list(chunker.chunks([TEXT * 5]))
+
+    assert all(counter.count(chunk) <= 120 for chunk in chunks)
+    sentences = sum(1 for _ in chunker.sentences([TEXT * 5]))
+    assert counter.requests < sentences / 4
+    assert counter.requests <= 2 * len(chunks)
+
+
+def test_unbroken_text_is_split_within_the_limit():
+    counter = ServerCounter()
+    chunker = StreamingChunker(counter, max_tokens=50)
+
+    chunks = list(chunker.chunks(["x" * 5000]))
+
+    assert all(counter.count(chunk) <= 50 for chunk in chunks)
+    assert ''.join(chunks) == "x" * 5000
+
+
+def test_dotted_abbreviations_do_not_end_sentences():
+    chunker = StreamingChunker(TokenCounter())
+    text = "Offices in the U.S. and abroad, e.g. Berlin, were listed. Dr. Alice Wong signed."
+    assert list(chunker.sentences([text])) == [
+        "Offices in the U.S. and abroad, e.g. Berlin, were listed.",
+        "Dr. Alice Wong signed."
+    ]
@@ -0,0 +1,30 @@
+# tests/test_distilled.py
+import sys
+from pathlib import Path
+
+# Allow running as `pytest tests/` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from distilled_store import DistilledStore
+from main import validate_distilled_file
+
+
+def write_store(path: Path) -> DistilledStore:
+    store = DistilledStore(path)
+    store.open({"target": "example"})
+    store.append({"result_number": 1, "url": "https://example.com/a", "analysis": "- fact"})
+    store.append_duplicate("https://mirror.example.com/a", "https://example.com/a", 0.97)
+    store.close()
+    return store
+
+
+def test_store_with_near_duplicates_validates(tmp_path):
+    store = write_store(tmp_path / "example_distilled.jsonl")
+    assert validate_distilled_file(str(store.path))
+    assert validate_distilled_file(str(store.compact(tmp_path / "example_distilled.json")))
+
+
+def test_duplicate_record_without_target_is_rejected(tmp_path):
+    path = tmp_path / "broken_distilled.jsonl"
+    path.write_text('{"type":"metadata"}\n{"type":"duplicate","url":"https://example.com/b"}\n', encoding='utf-8')
+    assert not validate_distilled_file(str(path))
@@ -0,0 +1,40 @@
+# tests/test_llm_cache.py
+import sys
+from pathlib import Path
+
+# Allow running as `pytest tests/` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llm_cache import LLMCache
+
+
+def payload(number: int):
+    return {"model": "m", "messages": [{"role": "user", "content": f"question {number}"}]}
+
+
+def rows(cache: LLMCache) -> int:
+    return cache.db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+
+def test_least_recently_used_entries_are_evicted_beyond_the_cap(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), max_entries=5)
+    for number in range(12):
+        cache.put(payload(number), f"answer {number}")
+        # Replacing an entry must not count as a new one
+        cache.put(payload(number), f"answer {number}")
+
+    assert rows(cache) == cache.count == 5
+    assert cache.get(payload(11)) == "answer 11"
+    assert cache.get(payload(0)) is None
+
+
+def test_count_is_resynced_with_other_writers(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = LLMCache(path, max_entries=10, recount_every=2)
+    second = LLMCache(path, max_entries=10, recount_every=2)
+    for number in range(8):
+        second.put(payload(number), "from another process")
+    for number in range(8, 14):
+        first.put(payload(number), "answer")
+
+    assert rows(first) == first.count == 10
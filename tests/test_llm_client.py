@@ -0,0 +1,109 @@
+# tests/test_llm_client.py
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+# Allow running as `pytest tests/` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llm_client import AdaptiveLimiter, CircuitBreaker, CircuitOpenError, LLMClient
+
+
+@pytest.fixture
+def stub_server():
+    """Chat completions stub that answers with the queued status codes, then 200"""
+    statuses = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            status = statuses.pop(0) if statuses else 200
+            body = json.dumps({"choices": [{"message": {"content": "ok"}}]} if status == 200 else {"error": "bad"})
+            payload = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1/chat/completions", statuses
+    server.shutdown()
+    server.server_close()
+
+
+def open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    return breaker
+
+
+def test_client_error_on_half_open_trial_closes_breaker(stub_server):
+    url, statuses = stub_server
+    client = LLMClient(url, breaker=open_breaker(), limiter=AdaptiveLimiter())
+
+    statuses.append(400)
+    with pytest.raises(requests.HTTPError):
+        client.chat([{"role": "user", "content": "trial"}])
+
+    # The server answered the trial, so the next call must go through
+    assert client.chat([{"role": "user", "content": "next"}]) == "ok"
+    assert client.breaker.opened_at is None
+
+
+def test_unexpected_error_on_half_open_trial_releases_trial(stub_server):
+    url, _ = stub_server
+    breaker = open_breaker()
+    client = LLMClient(url, breaker=breaker, limiter=AdaptiveLimiter())
+
+    def failing_post(*args, **kwargs):
+        raise ValueError("boom")
+
+    original_post = client.session.post
+    client.session.post = failing_post
+    with pytest.raises(ValueError):
+        client.chat([{"role": "user", "content": "trial"}])
+    assert not breaker.trial_in_flight
+
+    client.session.post = original_post
+    assert client.chat([{"role": "user", "content": "next"}]) == "ok"
+
+
+def test_open_breaker_short_circuits(stub_server):
+    url, _ = stub_server
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    client = LLMClient(url, breaker=breaker, limiter=AdaptiveLimiter())
+    with pytest.raises(CircuitOpenError):
+        client.chat([{"role": "user", "content": "blocked"}])
+
+
+def test_unrelated_bad_request_keeps_structured_output(stub_server):
+    url, statuses = stub_server
+    client = LLMClient(url, limiter=AdaptiveLimiter())
+
+    # Rejected with and without the schema, e.g. a prompt over the context length
+    statuses.extend([400, 400])
+    with pytest.raises(requests.HTTPError):
+        client.chat([{"role": "user", "content": "too long"}], response_format={"type": "json_object"})
+    assert client.structured_output
+
+
+def test_rejected_response_format_is_dropped(stub_server):
+    url, statuses = stub_server
+    client = LLMClient(url, limiter=AdaptiveLimiter())
+
+    statuses.append(400)
+    assert client.chat([{"role": "user", "content": "entities"}], response_format={"type": "json_object"}) == "ok"
+    assert not client.structured_output
@@ -0,0 +1,39 @@
+# tests/test_near_dup.py
+import random
+import sys
+from pathlib import Path
+
+# Allow running as `pytest tests/` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from near_dup import NearDuplicateIndex, simhash
+
+WORDS = ("the project report meeting office annual board member program research public record "
+         "interview account profile address contract team conference article network former").split()
+
+
+def article(rng: random.Random, words: int = 200) -> str:
+    sentences = []
+    for _ in range(words // 10):
+        sentences.append(f"Jane Example met {rng.choice(WORDS)} about the {' '.join(rng.choices(WORDS, k=7))}.")
+    return ' '.join(sentences)
+
+
+def test_mirror_with_different_title_and_chrome_is_a_near_duplicate():
+    for seed in range(6):
+        body = article(random.Random(seed))
+        index = NearDuplicateIndex()
+
+        assert index.check_and_add("https://example.com/a", simhash(f"Jane Example - page 3 {body} Fixture page")) is None
+        match = index.check_and_add(
+            "https://mirror.example.org/a",
+            simhash(f"Jane Example (mirror 3) syndicated copy {body} Republished with permission")
+        )
+        assert match is not None and match[0] == "https://example.com/a"
+
+
+def test_articles_sharing_a_template_are_kept_apart():
+    rng = random.Random(1)
+    index = NearDuplicateIndex()
+    matches = [index.check_and_add(f"https://example.com/{number}", simhash(article(rng))) for number in range(40)]
+    assert matches == [None] * 40
@@ -0,0 +1,184 @@
+# token_counter.py
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # Optional: only needed for --tokenizer files
+    Tokenizer = None
+
+# Word pieces and punctuation, used by the local stand-in estimator
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+# No tokenizer produces tokens longer than this on average, so a budget of N tokens never
+# needs more than N * 8 characters of text to be looked at
+WINDOW_CHARS_PER_TOKEN = 8
+
+
+class TokenCounter:
+    """Count tokens the way the model sees them, with memoization.
+
+    Backends are tried in order: a local HuggingFace `tokenizer.json` file,
+    the LLM server's own tokenize endpoint (llama.cpp `/tokenize` or
+    text-generation-webui `/v1/internal/token-count`), and finally a local
+    stand-in estimator when neither is available.
+    """
+
+    def __init__(self, llm_url: Optional[str] = None,
+                 tokenizer_path: Optional[str] = None,
+                 cache_size: int = 4096,
+                 timeout: float = 5):
+        self.logger = logging.getLogger(__name__)
+        self.timeout = timeout
+        self.tokenizer = None
+        self.server_endpoint: Optional[str] = None
+        self.server_checked = llm_url is None
+        self.base_url = None
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+
+        if tokenizer_path:
+            if Tokenizer is None:
+                self.logger.warning("The 'tokenizers' package is not installed; ignoring tokenizer file")
+            else:
+                self.tokenizer = Tokenizer.from_file(tokenizer_path)
+                self.server_checked = True
+
+        if llm_url and not self.tokenizer:
+            parsed = urlparse(llm_url)
+            self.base_url = f"{parsed.scheme}://{parsed.netloc}"
+
+        # Keyed on a digest so memoized page-sized texts are not kept alive
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+    @property
+    def backend(self) -> str:
+        if self.tokenizer:
+            return "tokenizer"
+        if self.server_endpoint:
+            return "server"
+        return "estimate"
+
+    @staticmethod
+    def estimate(text: str) -> int:
+        """Local stand-in: one token per punctuation mark and per ~4 characters of a word"""
+        return sum(1 + (len(piece) - 1) // 4 for piece in _PIECES.findall(text))
+
+    def _server_count(self, endpoint: str, text: str) -> int:
+        if endpoint.endswith("/tokenize"):
+            response = self.session.post(endpoint, json={"content": text}, timeout=self.timeout)
+            response.raise_for_status()
+            return len(response.json()["tokens"])
+        response = self.session.post(endpoint, json={"text": text}, timeout=self.timeout)
+        response.raise_for_status()
+        return int(response.json()["length"])
+
+    def _detect_server(self) -> None:
+        """Find out once which tokenize endpoint, if any, the server offers"""
+        with self.lock:
+            if self.server_checked:
+                return
+            for path in ("/tokenize", "/v1/internal/token-count"):
+                endpoint = self.base_url + path
+                try:
+                    self._server_count(endpoint, "probe")
+                    self.server_endpoint = endpoint
+                    self.logger.info(f"Counting tokens with server endpoint {endpoint}")
+                    break
+                except Exception:
+                    continue
+            else:
+                self.logger.info("No tokenize endpoint available; estimating token counts locally")
+            self.server_checked = True
+
+    def _count_uncached(self, text: str) -> int:
+        if self.tokenizer:
+            return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+        if not self.server_checked:
+            self._detect_server()
+        if self.server_endpoint:
+            try:
+                return self._server_count(self.server_endpoint, text)
+            except Exception as e:
+                self.logger.warning(f"Tokenize request failed, estimating instead: {str(e)}")
+        return self.estimate(text)
+
+    def count(self, text: str) -> int:
+        """Number of tokens in `text`"""
+        if not text:
+            return 0
+        key = hashlib.blake2b(text.encode('utf-8', errors='replace'), digest_size=16).digest()
+        with self.cache_lock:
+            tokens = self.cache.get(key)
+            if tokens is not None:
+                self.cache.move_to_end(key)
+                return tokens
+
+        tokens = self._count_uncached(text)
+        with self.cache_lock:
+            self.cache[key] = tokens
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return tokens
+
+    def count_within(self, text: str, max_tokens: int) -> int:
+        """Tokens in `text`, capped at `max_tokens`, without counting more text than the cap can need"""
+        window = text[:max_tokens * WINDOW_CHARS_PER_TOKEN]
+        tokens = self.count(window)
+        # Text beyond the window could still hold tokens, so assume the cap is reached
+        if len(window) < len(text) and tokens < max_tokens:
+            return max_tokens
+        return min(tokens, max_tokens)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of `text` within `max_tokens`, cut at a word boundary where possible"""
+        if max_tokens <= 0:
+            return ""
+        # A whole page may be megabytes; only its first few characters per token can end up in the result
+        text = text[:max_tokens * WINDOW_CHARS_PER_TOKEN]
+        total = self.count(text)
+        if total <= max_tokens:
+            return text
+
+        if self.tokenizer:
+            encoding = self.tokenizer.encode(text, add_special_tokens=False)
+            end = encoding.offsets[max_tokens - 1][1]
+        else:
+            # Scale the cut by the observed characters-per-token ratio until it fits
+            end = int(len(text) * max_tokens / total)
+            tokens = self.count(text[:end])
+            while tokens > max_tokens and end > 0:
+                end = int(end * max_tokens / tokens * 0.98)
+                tokens = self.count(text[:end])
+
+        boundary = max(text.rfind(' ', 0, end), text.rfind('\n', 0, end))
+        if boundary > end * 0.8:
+            end = boundary
+        return text[:end]
+
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        """Split `text` into consecutive pieces of at most `max_tokens` each"""
+        pieces = []
+        window = max(1, max_tokens) * WINDOW_CHARS_PER_TOKEN
+        position = 0
+        # Advance an offset rather than re-slicing the remaining text, which would copy it per piece
+        while position < len(text):
+            rest = text[position:position + window]
+            piece = self.truncate(rest, max_tokens)
+            if not piece:
+                # Guarantee progress even if a single word exceeds the budget
+                piece = rest[:max(1, max_tokens)]
+            pieces.append(piece)
+            position += len(piece)
+            while position < len(text) and text[position].isspace():
+                position += 1
+        return pieces
@@ -0,0 +1,70 @@
+# url_utils.py
+from typing import Set
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# Query parameters that only track where a click came from, on any site
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl'
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_')
+
+# Generic-looking parameters that are only known to be tracking on specific sites
+# (elsewhere e.g. `ref` can select a git branch), keyed by registered domain
+HOST_TRACKING_PARAMS = {
+    'youtube.com': {'si', 'feature'},
+    'youtu.be': {'si', 'feature'},
+    'spotify.com': {'si'},
+    'twitter.com': {'ref_src', 'ref_url', 's'},
+    'x.com': {'ref_src', 'ref_url', 's'},
+    'instagram.com': {'igsh'},
+    'linkedin.com': {'trk', 'trackingId'},
+    'amazon.com': {'ref', 'ref_'},
+    'aliexpress.com': {'spm'},
+    'taobao.com': {'spm'},
+    'tmall.com': {'spm'},
+}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _host_tracking_params(host: str) -> Set[str]:
+    """Site-specific tracking parameters for a host or any of its subdomains"""
+    labels = host.lower().split('.')
+    for start in range(len(labels) - 1):
+        params = HOST_TRACKING_PARAMS.get('.'.join(labels[start:]))
+        if params is not None:
+            return params
+    return set()
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so trivially different links to the same page compare equal.
+
+    Scheme differences (http/https), host case, default ports, fragments,
+    tracking parameters, query parameter order and trailing slashes are all
+    ignored. The result is a comparison key, not necessarily a fetchable URL.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = (parsed.hostname or '').lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(parsed.scheme.lower()):
+        host = f"{host}:{port}"
+
+    path = parsed.path.rstrip('/') or '/'
+
+    host_params = _host_tracking_params(parsed.hostname or '')
+    query = [
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+        and key not in host_params
+    ]
+    query.sort()
+
+    return urlunparse((scheme, host, path, '', urlencode(query), ''))